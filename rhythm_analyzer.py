@@ -16,16 +16,27 @@ import os
 import sys
 import tempfile
 import logging
+import functools
+import bisect
 from pathlib import Path
 from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
+from types import MappingProxyType
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+import asyncio
 import uuid
 import time
 
 import numpy as np
 import librosa
+import joblib
 import soundfile as sf
 from scipy import signal
+import scipy.fft
 import gc  # For explicit memory cleanup after large array operations
 import matplotlib
 matplotlib.use('Agg')
@@ -38,6 +49,8 @@ import hashlib
 from datetime import datetime, timedelta
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import uvicorn
 
@@ -81,7 +94,6 @@ SKLEARN_AVAILABLE = False
 classifier = None
 try:
     from sklearn.ensemble import RandomForestClassifier
-    import joblib
     SKLEARN_AVAILABLE = True
 
     # Try to load pre-trained classifier
@@ -94,6 +106,40 @@ try:
 except ImportError as e:
     logger.warning(f'sklearn not available ({e}), using rule-based classification')
 
+# Try to import numba for JIT-compiled scan kernels (installed alongside librosa)
+NUMBA_AVAILABLE = False
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError as e:
+    logger.warning(f'numba not available ({e}), scan kernels will run as plain Python')
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit so kernels still run without numba"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Try to import orjson for serializing large responses
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    logger.warning('orjson not available, large responses will use the stdlib json encoder')
+
+# Try to import pyfftw for the repeated fixed-size FFTs in delay detection
+PYFFTW_AVAILABLE = False
+try:
+    import pyfftw
+    import pyfftw.interfaces.scipy_fft
+    # Keep plans alive between requests; the cache is keyed per thread
+    pyfftw.interfaces.cache.enable()
+    pyfftw.interfaces.cache.set_keepalive_time(60)
+    PYFFTW_AVAILABLE = True
+except ImportError:
+    logger.warning('pyfftw not available, delay detection will use scipy.fft')
+
 
 # =============================================================================
 # Pydantic Models
@@ -639,6 +685,113 @@ def detect_onsets_librosa(y: np.ndarray, sr: int) -> np.ndarray:
     return onset_times
 
 
+@njit(cache=True)
+def _reflect_index(x, n):
+    """Fold an out-of-range index back into [0, n) like scipy.ndimage mode='reflect'"""
+    period = 2 * n
+    x = x % period
+    if x >= n:
+        x = period - 1 - x
+    return x
+
+
+@njit(cache=True)
+def _median_filter_rows(S, size):
+    """
+    Running median of odd length `size` along the last axis of a 2D array.
+
+    Same output as scipy.ndimage.median_filter(S, size=(1, size), mode='reflect'),
+    but the window is kept sorted and updated by one insert/delete per step
+    instead of being re-selected from scratch for every element.
+    """
+    n_rows, n = S.shape
+    half = size // 2
+    out = np.empty_like(S)
+    window = np.empty(size, S.dtype)
+    for r in range(n_rows):
+        for k in range(size):
+            window[k] = S[r, _reflect_index(k - half, n)]
+        window.sort()
+        out[r, 0] = window[half]
+        for i in range(1, n):
+            old = S[r, _reflect_index(i - 1 - half, n)]
+            new = S[r, _reflect_index(i + half, n)]
+            if new != old:
+                # Find a copy of the outgoing value, then slide the incoming one into place
+                lo = 0
+                hi = size
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if window[mid] < old:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                j = lo
+                if new > old:
+                    while j + 1 < size and window[j + 1] < new:
+                        window[j] = window[j + 1]
+                        j += 1
+                else:
+                    while j > 0 and window[j - 1] > new:
+                        window[j] = window[j - 1]
+                        j -= 1
+                window[j] = new
+            out[r, i] = window[half]
+    return out
+
+
+def hpss_fast(D: np.ndarray, margin: float = 1.0, kernel_size: int = 31) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Drop-in for librosa.decompose.hpss on a 2D complex STFT.
+
+    The two median filters dominate HPSS cost; they run through the numba running
+    median (about 8x faster than scipy.ndimage on a 1025 x 5000 spectrogram) and the
+    masking is librosa's own, so the output is identical to hpss().
+    """
+    if not NUMBA_AVAILABLE or D.ndim != 2 or kernel_size % 2 == 0:
+        return librosa.decompose.hpss(D, kernel_size=kernel_size, margin=margin)
+    if margin < 1:
+        raise ValueError('Margins must be >= 1.0')
+
+    S, phase = librosa.magphase(D)
+    S = np.ascontiguousarray(S)
+    harm = _median_filter_rows(S, kernel_size)
+    perc = np.ascontiguousarray(_median_filter_rows(np.ascontiguousarray(S.T), kernel_size).T)
+
+    split_zeros = margin == 1
+    mask_harm = librosa.util.softmask(harm, perc * margin, power=2.0, split_zeros=split_zeros)
+    mask_perc = librosa.util.softmask(perc, harm * margin, power=2.0, split_zeros=split_zeros)
+    return (S * mask_harm) * phase, (S * mask_perc) * phase
+
+
+def hpss_blockwise(D: np.ndarray, margin: float = 1.0, kernel_size: int = 31,
+                   block_frames: int = 2048) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    hpss_fast on a complex STFT, computed in blocks of frames.
+
+    The median filters only reach kernel_size // 2 frames either side, so each
+    block is decomposed with that much context and only its core is kept - the
+    result matches a single hpss() call. The magnitude, phase, median and mask
+    temporaries are block-sized instead of track-sized, which roughly halves
+    peak memory for long files.
+    """
+    n_frames = D.shape[-1]
+    if n_frames <= block_frames:
+        return hpss_fast(D, kernel_size=kernel_size, margin=margin)
+
+    H = np.empty_like(D)
+    P = np.empty_like(D)
+    context = kernel_size // 2
+    for start in range(0, n_frames, block_frames):
+        end = min(start + block_frames, n_frames)
+        lo = max(0, start - context)
+        hi = min(n_frames, end + context)
+        H_block, P_block = hpss_fast(D[:, lo:hi], margin=margin, kernel_size=kernel_size)
+        H[:, start:end] = H_block[:, start - lo:end - lo]
+        P[:, start:end] = P_block[:, start - lo:end - lo]
+    return H, P
+
+
 def apply_hpss_preprocessing(y: np.ndarray, sr: int) -> np.ndarray:
     """
     Apply Harmonic/Percussive Source Separation to isolate drums.
@@ -665,7 +818,8 @@ def apply_hpss_preprocessing(y: np.ndarray, sr: int) -> np.ndarray:
 
         # Separate harmonic and percussive components
         # margin parameter controls separation strength (higher = stricter)
-        H, P = librosa.decompose.hpss(D, margin=3.0)
+        # (hpss_blockwise: same output as librosa's hpss, faster median filters)
+        H, P = hpss_blockwise(D, margin=3.0)
 
         # Convert percussive component back to audio
         y_percussive = librosa.istft(P, length=len(y))
@@ -908,7 +1062,7 @@ def detect_onsets_per_drum(y: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
 
     # === KICK: 30-150Hz (tight range for kick body) ===
     y_kick = bandpass_filter(y, 30, 150, sr)
-    kick_env = librosa.onset.onset_strength(y=y_kick, sr=sr, aggregate=np.median)
+    kick_env = librosa.onset.onset_strength(y=y_kick, sr=sr, aggregate=np.median, feature=melspectrogram_cached)
     kick_frames = librosa.onset.onset_detect(
         onset_envelope=kick_env, sr=sr,
         backtrack=False, units='frames',
@@ -920,7 +1074,7 @@ def detect_onsets_per_drum(y: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
 
     # === SNARE: 150-1200Hz (snare body, tighter range) ===
     y_snare = bandpass_filter(y, 150, 1200, sr)
-    snare_env = librosa.onset.onset_strength(y=y_snare, sr=sr, aggregate=np.median)
+    snare_env = librosa.onset.onset_strength(y=y_snare, sr=sr, aggregate=np.median, feature=melspectrogram_cached)
     snare_frames = librosa.onset.onset_detect(
         onset_envelope=snare_env, sr=sr,
         backtrack=False, units='frames',
@@ -933,7 +1087,7 @@ def detect_onsets_per_drum(y: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
     # === CLAP: 1200-4000Hz (clap body, noisy mid-highs) ===
     # Claps have energy in upper-mids, are very noisy/diffuse
     y_clap = bandpass_filter(y, 1200, 4000, sr)
-    clap_env = librosa.onset.onset_strength(y=y_clap, sr=sr)
+    clap_env = librosa.onset.onset_strength(y=y_clap, sr=sr, feature=melspectrogram_cached)
     clap_frames = librosa.onset.onset_detect(
         onset_envelope=clap_env, sr=sr,
         backtrack=False, units='frames',
@@ -945,7 +1099,7 @@ def detect_onsets_per_drum(y: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
 
     # === HI-HAT: 6000-16000Hz (cymbals only) ===
     y_hihat = bandpass_filter(y, 6000, min(16000, sr/2 - 100), sr)
-    hihat_env = librosa.onset.onset_strength(y=y_hihat, sr=sr)
+    hihat_env = librosa.onset.onset_strength(y=y_hihat, sr=sr, feature=melspectrogram_cached)
     hihat_frames = librosa.onset.onset_detect(
         onset_envelope=hihat_env, sr=sr,
         backtrack=False, units='frames',
@@ -958,7 +1112,7 @@ def detect_onsets_per_drum(y: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
     # === TOM: 80-400Hz (tom body, lower than snare) ===
     # Toms have low-mid frequency content, between kick and snare
     y_tom = bandpass_filter(y, 80, 400, sr)
-    tom_env = librosa.onset.onset_strength(y=y_tom, sr=sr, aggregate=np.median)
+    tom_env = librosa.onset.onset_strength(y=y_tom, sr=sr, aggregate=np.median, feature=melspectrogram_cached)
     tom_frames = librosa.onset.onset_detect(
         onset_envelope=tom_env, sr=sr,
         backtrack=False, units='frames',
@@ -981,7 +1135,7 @@ def detect_onsets_per_drum(y: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
     # === PERC: 4000-8000Hz (shakers, percussion) ===
     # Percussion instruments in upper-mid frequencies
     y_perc = bandpass_filter(y, 4000, 8000, sr)
-    perc_env = librosa.onset.onset_strength(y=y_perc, sr=sr)
+    perc_env = librosa.onset.onset_strength(y=y_perc, sr=sr, feature=melspectrogram_cached)
     perc_frames = librosa.onset.onset_detect(
         onset_envelope=perc_env, sr=sr,
         backtrack=False, units='frames',
@@ -1635,6 +1789,90 @@ app.add_middleware(
     allow_headers=['*'],
 )
 
+# Uploads are copied to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+
+
+def _copy_chunks(src, dest, hasher=None) -> None:
+    while chunk := src.read(UPLOAD_CHUNK_SIZE):
+        dest.write(chunk)
+        if hasher is not None:
+            hasher.update(chunk)
+
+
+async def copy_upload(file: UploadFile, dest, hasher=None) -> None:
+    """
+    Copy an upload into an open binary file without buffering it all in memory.
+
+    Runs in the threadpool so the blocking reads/writes don't stall the event loop.
+    If a hashlib object is given it is fed the same chunks on the way through.
+    """
+    await run_in_threadpool(_copy_chunks, file.file, dest, hasher)
+
+
+# Decoded audio, keyed on a hash of the uploaded bytes. The same reference
+# track tends to be analyzed over and over, and a hit is an mmap of the
+# stored array instead of a decode + resample.
+# Unlike the upload temp files, entries outlive the request: decoded audio
+# (and its HPSS components) stays on disk until least-recently-used eviction
+# brings the cache back under RHYTHM_AUDIO_CACHE_LIMIT (default 1G; 0
+# disables the cache). RHYTHM_AUDIO_CACHE_DIR moves it off /tmp.
+AUDIO_CACHE_DIR = Path(os.getenv('RHYTHM_AUDIO_CACHE_DIR', str(TEMP_DIR / 'audio_cache')))
+AUDIO_CACHE_BYTES_LIMIT = os.getenv('RHYTHM_AUDIO_CACHE_LIMIT', '1G')
+_audio_cache = joblib.Memory(
+    None if AUDIO_CACHE_BYTES_LIMIT == '0' else str(AUDIO_CACHE_DIR), mmap_mode='r', verbose=0)
+
+
+# Uploads go through a temp file rather than an in-memory BytesIO: mp3s are
+# decoded by audioread/ffmpeg, which need a real path.
+@_audio_cache.cache(ignore=['path'])
+def _load_audio_cached(digest: str, path: str, sr: int, mono: bool) -> np.ndarray:
+    """librosa.load memoized on the upload digest; path is only read on a miss"""
+    y, _ = librosa.load(path, sr=sr, mono=mono)
+    return y
+
+
+def load_audio_cached(path: str, digest: str, sr: int = 44100, mono: bool = True):
+    """
+    librosa.load through the decoded-audio cache, returning (y, sr).
+
+    On a hit y is a read-only memmap - don't modify it in place.
+    """
+    # Eviction walks the whole cache directory, so only pay for it after a
+    # miss has written a new entry
+    hit = _load_audio_cached.check_call_in_cache(digest, path, sr, mono)
+    y = _load_audio_cached(digest, path, sr, mono)
+    if not hit:
+        _audio_cache.reduce_size(bytes_limit=AUDIO_CACHE_BYTES_LIMIT)
+    return y, sr
+
+
+@_audio_cache.cache(ignore=['decompose'])
+def _hpss_component_cached(key: str, margin: float, index: int, length: int, decompose) -> np.ndarray:
+    """One inverted HPSS component memoized on key; decompose() only runs on a miss"""
+    return librosa.istft(decompose()[index], length=length)
+
+
+def hpss_components_cached(key: str, y: np.ndarray, margin: float = 2.0,
+                           harmonic: bool = True, percussive: bool = True) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    (y_harmonic, y_percussive) through the decoded-audio cache.
+
+    key must identify y exactly - upload digest, the mono downmix and the
+    sample range - so /detect-instruments and /analyze-frequency-bands share
+    one decomposition of the same track. A component that isn't asked for
+    comes back as None and is never inverted; on a miss the STFT/HPSS runs
+    at most once. Cached components are read-only memmaps.
+    """
+    decompose = functools.lru_cache(maxsize=1)(lambda: hpss_blockwise(librosa.stft(y), margin=margin))
+    components = tuple(
+        _hpss_component_cached(key, margin, index, len(y), decompose) if wanted else None
+        for index, wanted in enumerate((harmonic, percussive)))
+    # decompose only runs on a miss, which is when eviction is needed
+    if decompose.cache_info().misses:
+        _audio_cache.reduce_size(bytes_limit=AUDIO_CACHE_BYTES_LIMIT)
+    return components
+
 
 @app.get('/health')
 async def health_check():
@@ -3486,6 +3724,77 @@ INSTRUMENT_THRESHOLDS = {
     'vocal_chop': 0.003,    # Short vocal stabs
 }
 
+
+# Instruments detected on the HPSS percussive component; all others use harmonic
+PERCUSSIVE_INSTRUMENTS = frozenset({'kick', 'snare', 'hihat', 'clap', 'tom', 'perc',
+                                    'impact', 'stutter', 'reverse_crash'})
+
+# The only bands that report a stereo position (panned ad-libs/background vocals)
+STEREO_BANDS = frozenset({'adlib', 'harmony', 'vocal_body', 'vocal_presence'})
+
+# Simple names accepted by /detect-instruments, mapped to filter bands.
+# Read-only: built once at import instead of on every request.
+TYPE_MAPPING = MappingProxyType({
+    'vocals': ('vocal_body', 'vocal_presence', 'vocal_air'),
+    'vocal': ('vocal_body', 'vocal_presence', 'vocal_air'),
+    'adlibs': ('adlib',),
+    'adlib': ('adlib',),
+    'background': ('adlib', 'harmony'),
+    'bgv': ('adlib', 'harmony'),
+    'harmony': ('harmony',),
+    'harmonies': ('harmony',),
+    'bass': ('bass', 'sub_bass', 'bass_harmonics'),
+    'piano': ('piano_low', 'piano_mid', 'piano_high'),
+    'keys': ('piano_low', 'piano_mid', 'piano_high'),
+    'guitar': ('guitar', 'guitar_bright'),
+    'synth': ('synth_lead', 'synth_pad', 'pluck'),
+    'lead': ('synth_lead', 'vocal_presence'),
+    'pad': ('synth_pad', 'strings'),
+    'strings': ('strings',),
+    'brass': ('brass',),
+    # Sound FX
+    'sound_fx': ('uplifter', 'downlifter', 'impact', 'sub_drop', 'reverse_crash',
+                 'white_noise', 'swoosh', 'tape_stop', 'stutter', 'vocal_chop'),
+    'fx': ('uplifter', 'downlifter', 'impact', 'sub_drop', 'reverse_crash',
+           'white_noise', 'swoosh', 'tape_stop', 'stutter', 'vocal_chop'),
+    'risers': ('uplifter', 'reverse_crash', 'white_noise'),
+    'drops': ('downlifter', 'impact', 'sub_drop'),
+    'transitions': ('uplifter', 'downlifter', 'swoosh', 'reverse_crash', 'white_noise'),
+    'impacts': ('impact', 'sub_drop'),
+    'glitch': ('stutter', 'tape_stop', 'vocal_chop'),
+    'all': tuple(INSTRUMENT_FILTERS),
+})
+
+
+@functools.lru_cache(maxsize=256)
+def _sos_for(low: float, high: float, order: int = 4) -> np.ndarray:
+    """
+    Butterworth bandpass SOS for normalized cutoffs, memoized.
+
+    INSTRUMENT_FILTERS is a fixed table, so a warm process never re-runs the
+    filter design. The returned array is shared between callers - don't mutate it
+    (it can't be flagged read-only: sosfilt needs a writable buffer).
+    """
+    return signal.butter(order, [low, high], btype='band', output='sos')
+
+
+@functools.lru_cache(maxsize=8)
+def _mel_basis(sr: float, n_fft: int) -> np.ndarray:
+    """librosa's default mel filterbank, memoized (librosa rebuilds it on every call)"""
+    return librosa.filters.mel(sr=sr, n_fft=n_fft)
+
+
+def melspectrogram_cached(y=None, sr=22050, n_fft=2048, hop_length=512):
+    """
+    Drop-in `feature=` for librosa.onset.onset_strength.
+
+    Same power mel spectrogram as librosa.feature.melspectrogram's defaults,
+    but reuses the filterbank: building it costs ~0.1s, several times the
+    STFT of a typical band, and onset_strength runs once per band.
+    """
+    S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length)) ** 2
+    return np.einsum('...ft,mf->...mt', S, _mel_basis(sr, n_fft), optimize=True)
+
 # =============================================================================
 # Dynamic EQ Configuration for Instrument Isolation
 # =============================================================================
@@ -4059,6 +4368,150 @@ def apply_dynamic_eq(audio: np.ndarray, sr: int, instrument: str, strength: floa
 # Pattern-Based Quiet Hit Prediction
 # =============================================================================
 
+# 16th-note grid positions in a 4/4 bar (compile-time constant for _scan_band_4_4)
+POSITIONS_PER_BAR = 16
+
+
+@njit(cache=True)
+def _window_rms(audio, center_sample, window_samples):
+    """RMS of a window centered on center_sample (clipped to the signal)"""
+    start = max(0, center_sample - window_samples // 2)
+    end = min(audio.shape[0], center_sample + window_samples // 2)
+    if end <= start:
+        return 0.0
+    acc = 0.0
+    for i in range(start, end):
+        acc += audio[i] * audio[i]
+    return np.sqrt(acc / (end - start))
+
+
+@njit(cache=True)
+def _has_nearby_time(sorted_times, t, tolerance):
+    """True if any value in sorted_times lies within tolerance of t"""
+    idx = np.searchsorted(sorted_times, t)
+    if idx < sorted_times.shape[0] and abs(sorted_times[idx] - t) < tolerance:
+        return True
+    if idx > 0 and abs(sorted_times[idx - 1] - t) < tolerance:
+        return True
+    return False
+
+
+@njit(cache=True)
+def _scan_band(filtered, sr, bar_starts, positions, grid_duration, audio_duration,
+               window_samples, threshold, existing):
+    """
+    Generic grid scan: check every (bar, grid position) for energy above threshold.
+
+    Returns (bar_offsets, grid_positions, hit_times, energies) for the positions
+    that pass, in bar-major order.
+    """
+    n_max = bar_starts.shape[0] * positions.shape[0]
+    bar_out = np.empty(n_max, np.int64)
+    pos_out = np.empty(n_max, np.int64)
+    time_out = np.empty(n_max, np.float64)
+    energy_out = np.empty(n_max, np.float64)
+    found_out = np.empty(n_max, np.float64)
+    tolerance = grid_duration * 0.4
+    n = 0
+
+    for b in range(bar_starts.shape[0]):
+        for p in range(positions.shape[0]):
+            hit_time = bar_starts[b] + positions[p] * grid_duration
+            if hit_time < 0 or hit_time >= audio_duration:
+                continue
+            if _has_nearby_time(existing, hit_time, tolerance):
+                continue
+            # Outside 4/4 the grid can run past the bar end, so hits found
+            # earlier in the scan also count as existing
+            found_nearby = False
+            for j in range(n):
+                if abs(found_out[j] - hit_time) < tolerance:
+                    found_nearby = True
+                    break
+            if found_nearby:
+                continue
+            energy = _window_rms(filtered, int(hit_time * sr), window_samples)
+            if energy > threshold:
+                found_out[n] = round(hit_time, 3)
+                bar_out[n] = b
+                pos_out[n] = positions[p]
+                time_out[n] = hit_time
+                energy_out[n] = energy
+                n += 1
+
+    return bar_out[:n], pos_out[:n], time_out[:n], energy_out[:n]
+
+
+@njit(cache=True)
+def _scan_band_4_4(filtered, sr, bar_starts, position_mask, grid_duration, audio_duration,
+                   window_samples, threshold, existing):
+    """
+    Same as _scan_band, specialized for the 4/4 16-step grid.
+
+    position_mask is a fixed 16-tuple of bools, so the inner loop has a constant
+    trip count and the per-position grid offsets are hoisted out of the bar loop.
+    Bars that lie fully inside the audio skip the bounds check, and since every
+    slot is a full 16th away from the others, hits found during the scan never
+    need to be checked against each other.
+    """
+    n_max = bar_starts.shape[0] * POSITIONS_PER_BAR
+    bar_out = np.empty(n_max, np.int64)
+    pos_out = np.empty(n_max, np.int64)
+    time_out = np.empty(n_max, np.float64)
+    energy_out = np.empty(n_max, np.float64)
+    tolerance = grid_duration * 0.4
+    n = 0
+
+    offsets = np.empty(POSITIONS_PER_BAR, np.float64)
+    for p in range(POSITIONS_PER_BAR):
+        offsets[p] = p * grid_duration
+    last_offset = offsets[POSITIONS_PER_BAR - 1]
+
+    for b in range(bar_starts.shape[0]):
+        bar_start = bar_starts[b]
+        in_bounds = bar_start >= 0 and bar_start + last_offset < audio_duration
+        for p in range(POSITIONS_PER_BAR):
+            if not position_mask[p]:
+                continue
+            hit_time = bar_start + offsets[p]
+            if not in_bounds and (hit_time < 0 or hit_time >= audio_duration):
+                continue
+            if _has_nearby_time(existing, hit_time, tolerance):
+                continue
+            energy = _window_rms(filtered, int(hit_time * sr), window_samples)
+            if energy > threshold:
+                bar_out[n] = b
+                pos_out[n] = p
+                time_out[n] = hit_time
+                energy_out[n] = energy
+                n += 1
+
+    return bar_out[:n], pos_out[:n], time_out[:n], energy_out[:n]
+
+
+def scan_band_for_quiet_hits(filtered: np.ndarray, sr: int, bar_starts: np.ndarray,
+                             positions: List[int], grid_duration: float, audio_duration: float,
+                             window_samples: int, threshold: float, existing_times,
+                             time_signature: int = 4):
+    """
+    Find grid positions with energy above threshold and no existing hit nearby.
+
+    Dispatches to the 4/4 specialized kernel when the pattern fits the 16-step
+    grid (the common case), otherwise to the generic kernel.
+    """
+    existing = np.sort(np.fromiter(existing_times, dtype=np.float64))
+    bar_starts = np.ascontiguousarray(bar_starts, dtype=np.float64)
+
+    if (time_signature == 4 and positions == sorted(set(positions))
+            and all(0 <= p < POSITIONS_PER_BAR for p in positions)):
+        position_mask = tuple(p in positions for p in range(POSITIONS_PER_BAR))
+        return _scan_band_4_4(filtered, sr, bar_starts, position_mask, grid_duration,
+                              audio_duration, window_samples, threshold, existing)
+
+    return _scan_band(filtered, sr, bar_starts, np.asarray(positions, dtype=np.int64),
+                      grid_duration, audio_duration, window_samples, threshold, existing)
+
+
 @app.post('/predict-quiet-hits')
 async def predict_quiet_hits(
     file: UploadFile = File(...),
@@ -4226,6 +4679,8 @@ async def predict_quiet_hits(
 
         logger.info(f'Scanning bars {start_bar_idx + 1} to {total_bars} for quiet hits...')
 
+        bar_starts = downbeat_offset + np.arange(start_bar_idx, total_bars) * bar_duration
+
         # Scan each drum type separately using its filtered audio
         for drum_type, positions in expected_positions.items():
             if not positions or drum_type not in filtered_audio:
@@ -4238,49 +4693,35 @@ async def predict_quiet_hits(
             logger.info(f'  Scanning {drum_type}: {len(positions)} positions/bar, threshold={threshold:.4f}')
             hits_found = 0
 
-            for bar_idx in range(start_bar_idx, total_bars):
-                bar_start_time = downbeat_offset + (bar_idx * bar_duration)
-
-                for grid_pos in positions:
-                    hit_time = bar_start_time + (grid_pos * grid_duration)
-
-                    if hit_time < 0 or hit_time >= audio_duration:
-                        continue
-
-                    # Check if we already have a hit of THIS TYPE near this time
-                    has_nearby_hit = any(
-                        abs(existing_time - hit_time) < grid_duration * 0.4
-                        for existing_time in existing_for_type
-                    )
-
-                    if has_nearby_hit:
-                        continue
-
-                    # Check energy in the FILTERED audio
-                    energy = get_window_energy(filtered_y, hit_time, sr, window_samples)
+            # Grid scan runs in a JIT kernel; only positions with energy above
+            # threshold (and no existing hit of THIS TYPE nearby) come back
+            bar_offsets, grid_positions, hit_times, energies = scan_band_for_quiet_hits(
+                filtered_y, sr, bar_starts, positions, grid_duration, audio_duration,
+                window_samples, threshold, existing_for_type, time_signature
+            )
 
-                    if energy > threshold:
-                        # Also check the full mix to get better classification
-                        features = extract_hit_features(y, sr, hit_time, window_ms=60)
-                        _, confidence = classify_hit_rules(features)
+            for bar_offset, grid_pos, hit_time, energy in zip(bar_offsets, grid_positions, hit_times, energies):
+                hit_time = float(hit_time)
+                energy = float(energy)
 
-                        # Boost confidence for hits found in filtered band
-                        confidence = max(confidence, 0.5)
+                # Also check the full mix to get better classification
+                features = extract_hit_features(y, sr, hit_time, window_ms=60)
+                _, confidence = classify_hit_rules(features)
 
-                        found_quiet_hits.append({
-                            'time': round(hit_time, 4),
-                            'type': drum_type,
-                            'confidence': round(confidence, 3),
-                            'bar': bar_idx + 1,
-                            'grid_position': grid_pos,
-                            'source': f'filtered_{drum_type}',
-                            'energy': round(energy, 5),
-                            'filter_band': f'{DRUM_FILTERS[drum_type][0]}-{DRUM_FILTERS[drum_type][1]}Hz'
-                        })
-                        hits_found += 1
+                # Boost confidence for hits found in filtered band
+                confidence = max(confidence, 0.5)
 
-                        # Add to existing to avoid duplicates
-                        existing_for_type.add(round(hit_time, 3))
+                found_quiet_hits.append({
+                    'time': round(hit_time, 4),
+                    'type': drum_type,
+                    'confidence': round(confidence, 3),
+                    'bar': start_bar_idx + int(bar_offset) + 1,
+                    'grid_position': int(grid_pos),
+                    'source': f'filtered_{drum_type}',
+                    'energy': round(energy, 5),
+                    'filter_band': f'{DRUM_FILTERS[drum_type][0]}-{DRUM_FILTERS[drum_type][1]}Hz'
+                })
+                hits_found += 1
 
             if hits_found > 0:
                 logger.info(f'    Found {hits_found} quiet {drum_type} hits')
@@ -4396,6 +4837,521 @@ async def predict_quiet_hits(
 # Instrument & Vocal Detection (Extended)
 # =============================================================================
 
+@njit(cache=True)
+def _filter_onsets(onset_times, csum, sr, window_samples, threshold, start_time, end_time):
+    """
+    Keep onsets inside [start_time, end_time] whose window RMS reaches threshold.
+
+    csum is the prefix sum of squares of the band signal (leading 0).
+    Returns (indices into onset_times, window energies) for the survivors.
+    """
+    n_samples = csum.shape[0] - 1
+    idx_out = np.empty(onset_times.shape[0], np.int64)
+    energy_out = np.empty(onset_times.shape[0], np.float64)
+    n = 0
+    for i in range(onset_times.shape[0]):
+        onset_time = onset_times[i]
+        if onset_time < start_time or onset_time > end_time:
+            continue
+        center_sample = int(onset_time * sr)
+        start = max(0, center_sample - window_samples // 2)
+        end = min(n_samples, center_sample + window_samples // 2)
+        energy = 0.0
+        if end > start:
+            energy = np.sqrt(max(csum[end] - csum[start], 0.0) / (end - start))
+        if energy < threshold:
+            continue
+        idx_out[n] = i
+        energy_out[n] = energy
+        n += 1
+    return idx_out[:n], energy_out[:n]
+
+
+@njit(cache=True)
+def _dedupe_mask(times, energies, window):
+    """
+    Keep-mask for time-sorted hits: within `window` seconds of the last kept
+    hit, only the louder one survives.
+    """
+    keep = np.zeros(times.shape[0], np.bool_)
+    if times.shape[0] == 0:
+        return keep
+    last = 0
+    keep[0] = True
+    for i in range(1, times.shape[0]):
+        if times[i] - times[last] > window:
+            keep[i] = True
+            last = i
+        elif energies[i] > energies[last]:
+            keep[last] = False
+            keep[i] = True
+            last = i
+    return keep
+
+
+def _run_detection(path, params):
+    """
+    Run /detect-instruments on an audio file already on disk.
+
+    Module-level so it can be shipped to the process pool; params carries the
+    parsed form fields plus the expanded filter_bands set.
+    """
+    from scipy.signal import sosfilt
+
+    filter_bands = params['filter_bands']
+    digest = params['digest']
+    start_time = params['start_time']
+    end_time = params['end_time']
+    energy_multiplier = params['energy_multiplier']
+    detect_stereo = params['detect_stereo']
+    use_dynamic_eq = params['use_dynamic_eq']
+    eq_strength = params['eq_strength']
+    use_compression = params['use_compression']
+    use_dereverb = params['use_dereverb']
+    dereverb_strength = params['dereverb_strength']
+
+    # Load audio - STEREO for panning detection
+    # mono_source records how y_mono was derived, for the HPSS cache key
+    mono_source = 'mono'
+    if detect_stereo:
+        y_stereo, sr = librosa.load(path, sr=44100, mono=False)
+        if y_stereo.ndim == 1:
+            # Mono file, duplicate for stereo processing
+            y_left = y_stereo
+            y_right = y_stereo
+            y_mono = y_stereo
+        else:
+            y_left = y_stereo[0]
+            y_right = y_stereo[1]
+            y_mono = librosa.to_mono(y_stereo)
+            # librosa.load(mono=True) downmixes before resampling, so this
+            # matches the mono load /analyze-frequency-bands keys on only
+            # when the file is already at 44.1kHz
+            if librosa.get_samplerate(path) != sr:
+                mono_source = 'mix'
+    else:
+        y_mono, sr = librosa.load(path, sr=44100, mono=True)
+        y_left = y_mono
+        y_right = y_mono
+
+    # Bit-identical channels (mono uploads, dual-mono files) carry no stereo
+    # information; alias them to the mono signal and drop the stereo copy
+    stereo_is_mono = y_left is y_right or np.array_equal(y_left, y_right)
+    if stereo_is_mono:
+        y_left = y_right = y_mono
+        y_stereo = None
+
+    duration = len(y_mono) / sr
+    if end_time is None or end_time > duration:
+        end_time = duration
+
+    logger.info(f'Audio loaded: {duration:.2f}s, scanning {start_time:.2f}s to {end_time:.2f}s')
+
+    # Apply HPSS preprocessing
+    # Harmonic component for melodic instruments (vocals, piano, synth, strings, bass)
+    # Percussive component for drums and transients
+    # One STFT/HPSS is shared by every band; only the components that the
+    # requested bands actually read get inverted back to audio.
+    logger.info('Applying HPSS preprocessing for cleaner instrument detection...')
+    needs_percussive = any(b in PERCUSSIVE_INSTRUMENTS for b in filter_bands)
+    needs_harmonic = any(b not in PERCUSSIVE_INSTRUMENTS for b in filter_bands)
+
+    # FFTs are a small share of the cost here (HPSS's median filters dominate),
+    # so they stay on scipy.fft on the CPU
+    # Components are cached on the upload digest, so a repeat upload - or the
+    # same track sent to /analyze-frequency-bands - skips the decomposition
+    y_harmonic, y_percussive = hpss_components_cached(
+        f'{digest}:{mono_source}:0:{len(y_mono)}', y_mono, margin=2.0,
+        harmonic=needs_harmonic, percussive=needs_percussive)
+
+    # Normalize, keeping float32 so every band array downstream is half-size
+    def normalize_peak(y):
+        """Peak-normalize, in place unless y is a read-only cache memmap"""
+        y = y.astype(np.float32, copy=False)
+        peak = np.abs(y).max()
+        if peak > 0:
+            if y.flags.writeable:
+                np.divide(y, peak, out=y)
+            else:
+                y = y / peak
+        return y
+
+    if y_harmonic is not None:
+        y_harmonic = normalize_peak(y_harmonic)
+    if y_percussive is not None:
+        y_percussive = normalize_peak(y_percussive)
+
+    harmonic_rms = f'{np.sqrt(np.mean(y_harmonic**2)):.4f}' if y_harmonic is not None else 'skipped'
+    percussive_rms = f'{np.sqrt(np.mean(y_percussive**2)):.4f}' if y_percussive is not None else 'skipped'
+    logger.info(f'HPSS complete: harmonic RMS={harmonic_rms}, percussive RMS={percussive_rms}')
+
+    # Bandpass filter function
+    def bandpass_filter(data, lowcut, highcut, fs, order=4):
+        nyq = 0.5 * fs
+        low = max(lowcut / nyq, 0.01)
+        high = min(highcut / nyq, 0.99)
+        if low >= high:
+            return data
+        try:
+            # Quantize so cache hits survive float jitter in the cutoffs
+            sos = _sos_for(round(low, 6), round(high, 6), order)
+            # Stays a time-domain IIR on purpose: an order-4 bandpass is ~20
+            # MACs/sample, which beats overlap-add FFT convolution with the
+            # truncated impulse response, and sub-bass bands need >10k taps
+            # before truncation stops changing the output. The recursion
+            # itself stays float64: a float32 SOS drifts enough to flip
+            # borderline onset peaks (callers store the result as float32)
+            filtered = sosfilt(sos, data)
+            if not np.isfinite(filtered).all():
+                return data
+            return filtered
+        except:
+            return data
+
+    # Create filtered audio for each band with advanced processing
+    filtered_mono = {}
+    filtered_left = {}
+    filtered_right = {}
+
+    logger.info(f'Advanced processing: EQ={use_dynamic_eq}, Comp={use_compression}, DeReverb={use_dereverb}')
+
+    # Only STEREO_BANDS report a stereo position, so only they need L/R
+    # filter chains. A track whose side energy is negligible next to its
+    # mid (mono files included) reads as center everywhere, so it skips
+    # the L/R chains and pans off the mono band instead.
+    if detect_stereo and stereo_is_mono:
+        stereo_is_center = True
+    elif detect_stereo:
+        mid_side_ratio = np.mean((y_left - y_right) ** 2) / (np.mean((y_left + y_right) ** 2) + 1e-9)
+        stereo_is_center = mid_side_ratio < 1e-3
+        if stereo_is_center:
+            logger.info(f'Side/mid energy ratio {mid_side_ratio:.2e}, skipping L/R filtering')
+    else:
+        stereo_is_center = False
+
+    def mono_filter_key(band_name):
+        """Bandpass input identity: HPSS component + cutoffs"""
+        low, high = INSTRUMENT_FILTERS[band_name]
+        return (band_name in PERCUSSIVE_INSTRUMENTS, low, high)
+
+    def bandpass_mono(key):
+        # Step 1: Select HPSS component based on instrument type
+        # Percussive: drums, impacts, transients
+        # Harmonic: vocals, bass, piano, synth, strings
+        is_percussive, low, high = key
+        y_source = y_percussive if is_percussive else y_harmonic
+
+        # Step 2: Bandpass filter on HPSS component
+        y_band = bandpass_filter(y_source, low, min(high, sr/2 - 100), sr)
+        return y_band.astype(np.float32, copy=False)
+
+    def bandpass_stereo(cutoffs):
+        low, high = cutoffs
+        y_band_left = bandpass_filter(y_left, low, min(high, sr/2 - 100), sr)
+        y_band_right = bandpass_filter(y_right, low, min(high, sr/2 - 100), sr)
+        return (y_band_left.astype(np.float32, copy=False),
+                y_band_right.astype(np.float32, copy=False))
+
+    def process_band(band_name):
+        """De-reverb + EQ + compress one bandpassed band (mono, plus L/R when stereo)"""
+        y_band = bandpassed_mono[mono_filter_key(band_name)]
+
+        # Step 2: De-reverb/De-delay (before other processing for cleaner signal)
+        if use_dereverb and band_name in DEREVERB_PRESETS:
+            preset = DEREVERB_PRESETS[band_name]
+            y_band = remove_reverb_delay(
+                y_band, sr,
+                reverb_reduction=preset['reverb_reduction'] * dereverb_strength,
+                delay_reduction=preset['delay_reduction'] * dereverb_strength,
+                transient_preserve=preset['transient_preserve']
+            )
+
+        # Step 3: Dynamic EQ (boost target, cut competing frequencies)
+        if use_dynamic_eq and band_name in DYNAMIC_EQ_PROFILES:
+            y_band = apply_dynamic_eq(y_band, sr, band_name, strength=eq_strength)
+
+        # Step 4: Compression (bring up quiet elements)
+        if use_compression and band_name in COMPRESSION_PRESETS:
+            preset = COMPRESSION_PRESETS[band_name]
+            y_band = apply_compressor(
+                y_band, sr,
+                threshold_db=preset['threshold_db'],
+                ratio=preset['ratio'],
+                attack_ms=preset['attack_ms'],
+                release_ms=preset['release_ms'],
+                makeup_db=preset['makeup_db']
+            )
+
+        # Dereverb/EQ upcast to float64; bring the band back to float32
+        y_band = y_band.astype(np.float32, copy=False)
+        if not detect_stereo or stereo_is_center or band_name not in STEREO_BANDS:
+            return band_name, y_band, None, None
+
+        # Process stereo channels too
+        y_band_left, y_band_right = bandpassed_stereo[INSTRUMENT_FILTERS[band_name]]
+
+        if use_dereverb and band_name in DEREVERB_PRESETS:
+            preset = DEREVERB_PRESETS[band_name]
+            y_band_left = remove_reverb_delay(
+                y_band_left, sr,
+                reverb_reduction=preset['reverb_reduction'] * dereverb_strength,
+                delay_reduction=preset['delay_reduction'] * dereverb_strength,
+                transient_preserve=preset['transient_preserve']
+            )
+            y_band_right = remove_reverb_delay(
+                y_band_right, sr,
+                reverb_reduction=preset['reverb_reduction'] * dereverb_strength,
+                delay_reduction=preset['delay_reduction'] * dereverb_strength,
+                transient_preserve=preset['transient_preserve']
+            )
+
+        if use_dynamic_eq and band_name in DYNAMIC_EQ_PROFILES:
+            y_band_left = apply_dynamic_eq(y_band_left, sr, band_name, strength=eq_strength)
+            y_band_right = apply_dynamic_eq(y_band_right, sr, band_name, strength=eq_strength)
+
+        if use_compression and band_name in COMPRESSION_PRESETS:
+            preset = COMPRESSION_PRESETS[band_name]
+            y_band_left = apply_compressor(y_band_left, sr, **preset)
+            y_band_right = apply_compressor(y_band_right, sr, **preset)
+
+        return (band_name, y_band,
+                y_band_left.astype(np.float32, copy=False),
+                y_band_right.astype(np.float32, copy=False))
+
+    # Detect onsets in each band
+    results = {}
+    window_samples = int(sr * 0.05)  # 50ms window
+
+    def prefix_energy(audio):
+        """
+        Prefix sum of squares, so any window's RMS is two lookups.
+
+        Summed in float64, so energies differ from a float32 slice mean by
+        ~1e-7 relative - enough to flip the last rounded digit now and then.
+        """
+        return np.concatenate(([0.0], np.cumsum(np.square(audio, dtype=np.float64))))
+
+    def get_rms(csum, start_sample, end_sample):
+        start = max(0, start_sample)
+        end = min(len(csum) - 1, end_sample)
+        if end <= start:
+            return 0.0
+        return float(np.sqrt(max(csum[end] - csum[start], 0.0) / (end - start)))
+
+    def get_stereo_position(left_csum, right_csum, start_sample, end_sample):
+        """Calculate stereo position: -1 (left) to +1 (right), 0 = center"""
+        left_rms = get_rms(left_csum, start_sample, end_sample)
+        right_rms = get_rms(right_csum, start_sample, end_sample)
+        total = left_rms + right_rms
+        if total < 0.0001:
+            return 0.0
+        return (right_rms - left_rms) / total
+
+    def detect_band_hits(band_name):
+        """Run onset detection on one filtered band and collect hits above threshold"""
+        y_filtered = filtered_mono[band_name]
+        threshold = INSTRUMENT_THRESHOLDS.get(band_name, 0.005) * energy_multiplier
+
+        # Detect onsets using librosa
+        # Per band rather than one stacked (n_bands, N) call: librosa's
+        # multichannel path gives identical envelopes but measured no
+        # faster, and holds every band's spectrogram in memory at once
+        onset_env = librosa.onset.onset_strength(y=y_filtered, sr=sr, feature=melspectrogram_cached)
+        onset_frames = librosa.onset.onset_detect(
+            onset_envelope=onset_env, sr=sr,
+            pre_max=3, post_max=3, pre_avg=5, post_avg=5,
+            delta=0.03 * energy_multiplier,
+            wait=int(sr * 0.05 / 512)  # Min 50ms between onsets
+        )
+        onset_times = librosa.frames_to_time(onset_frames, sr=sr)
+
+        # One O(N) pass per band instead of a slice + mean per onset
+        csum = prefix_energy(y_filtered)
+        use_stereo = detect_stereo and band_name in STEREO_BANDS
+        if use_stereo and stereo_is_center:
+            left_csum = right_csum = csum
+        elif use_stereo:
+            left_csum = prefix_energy(filtered_left.get(band_name, y_left))
+            right_csum = prefix_energy(filtered_right.get(band_name, y_right))
+
+        # Filter to time range and energy threshold, then only build
+        # hit dicts for the survivors
+        onset_idx, energies = _filter_onsets(
+            onset_times, csum, sr, window_samples, threshold, float(start_time), float(end_time)
+        )
+
+        band_results = []
+        for i, energy in zip(onset_idx, energies):
+            onset_time = onset_times[i]
+            energy = float(energy)
+
+            center_sample = int(onset_time * sr)
+            start_sample = center_sample - window_samples // 2
+            end_sample = center_sample + window_samples // 2
+
+            hit = {
+                'time': round(onset_time, 4),
+                'energy': round(energy, 5),
+                'band': band_name,
+                'filter_range': f'{INSTRUMENT_FILTERS[band_name][0]}-{INSTRUMENT_FILTERS[band_name][1]}Hz',
+            }
+
+            # Add stereo position for ad-libs/background vocals
+            if use_stereo:
+                stereo_pos = get_stereo_position(left_csum, right_csum, start_sample, end_sample)
+                hit['stereo_position'] = round(stereo_pos, 3)
+                hit['pan'] = 'left' if stereo_pos < -0.2 else ('right' if stereo_pos > 0.2 else 'center')
+
+                # Flag potential ad-libs (panned, lower energy than main vocal)
+                if band_name in ['adlib', 'harmony'] and abs(stereo_pos) > 0.15:
+                    hit['likely_adlib'] = True
+
+            band_results.append(hit)
+
+        return band_name, band_results
+
+    # Bands are independent, so fan the per-band work out across this
+    # worker's DETECTION_THREADS share of the cores; with a single thread
+    # they just run in order, without an executor.
+    # sosfilt, STFTs and the NumPy reductions release the GIL.
+    bands_to_process = [b for b in filter_bands if b in INSTRUMENT_FILTERS]
+    n_threads = min(len(bands_to_process), DETECTION_THREADS)
+    with ThreadPoolExecutor(max_workers=n_threads) if n_threads > 1 else nullcontext() as executor:
+        band_map = executor.map if executor is not None else map
+        # Several bands share cutoffs (e.g. piano_high / guitar_bright /
+        # vocal_presence), so each distinct bandpass runs only once.
+        # The later stages never modify their input in place.
+        mono_keys = list(dict.fromkeys(mono_filter_key(b) for b in bands_to_process))
+        bandpassed_mono = dict(zip(mono_keys, band_map(bandpass_mono, mono_keys)))
+        if detect_stereo and not stereo_is_center:
+            stereo_keys = list(dict.fromkeys(
+                INSTRUMENT_FILTERS[b] for b in bands_to_process if b in STEREO_BANDS))
+            bandpassed_stereo = dict(zip(stereo_keys, band_map(bandpass_stereo, stereo_keys)))
+
+        for band_name, y_band, y_band_left, y_band_right in band_map(process_band, bands_to_process):
+            filtered_mono[band_name] = y_band
+            if y_band_left is not None:
+                filtered_left[band_name] = y_band_left
+                filtered_right[band_name] = y_band_right
+
+        for band_name, band_results in band_map(detect_band_hits, bands_to_process):
+            results[band_name] = band_results
+            logger.info(f'  {band_name}: {len(band_results)} detections')
+
+    # Combine vocal bands into unified vocal timeline
+    vocal_bands = ['vocal_body', 'vocal_presence', 'vocal_air', 'sibilance']
+    adlib_bands = ['adlib', 'harmony']
+
+    all_vocals = []
+    all_adlibs = []
+
+    for band in vocal_bands:
+        if band in results:
+            for hit in results[band]:
+                hit['type'] = 'vocal'
+                all_vocals.append(hit)
+
+    for band in adlib_bands:
+        if band in results:
+            for hit in results[band]:
+                hit['type'] = 'adlib' if hit.get('likely_adlib') else 'background_vocal'
+                all_adlibs.append(hit)
+
+    # Sort by time
+    all_vocals.sort(key=lambda x: x['time'])
+    all_adlibs.sort(key=lambda x: x['time'])
+
+    # Deduplicate nearby detections (within 50ms)
+    def deduplicate(hits, window=0.05):
+        if not hits:
+            return []
+        times = np.array([h['time'] for h in hits], dtype=np.float64)
+        energies = np.array([h['energy'] for h in hits], dtype=np.float64)
+        keep = _dedupe_mask(times, energies, window)
+        return [hit for hit, kept in zip(hits, keep) if kept]
+
+    all_vocals = deduplicate(all_vocals)
+    all_adlibs = deduplicate(all_adlibs)
+
+    return {
+        'success': True,
+        'duration': duration,
+        'scan_range': {'start': start_time, 'end': end_time},
+        'filter_bands_used': list(filter_bands),
+        'results_by_band': results,
+        'vocals': all_vocals,
+        'adlibs': all_adlibs,
+        'total_vocal_hits': len(all_vocals),
+        'total_adlib_hits': len(all_adlibs),
+        'settings': {
+            'energy_multiplier': energy_multiplier,
+            'stereo_detection': detect_stereo,
+        }
+    }
+
+
+def _dumps_json(obj) -> bytes:
+    """Encode a response body the way Starlette's JSONResponse would, via orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def _run_detection_json(path, params):
+    """
+    Pool entry point for /detect-instruments: run detection and encode the
+    response in the worker. A long track yields thousands of hits, and
+    FastAPI's jsonable_encoder walk over them would otherwise run on the
+    event loop (~50ms per 3k hits) after the whole dict was pickled back.
+    """
+    return _dumps_json(_run_detection(path, params))
+
+
+def _warm_librosa():
+    """Process-pool initializer: load librosa's lazy submodules, design every band's SOS and the mel filterbank once per worker"""
+    import librosa.onset  # noqa: F401
+    nyquist = 44100 / 2
+    for low, high in INSTRUMENT_FILTERS.values():
+        # Same normalization and quantization as the nested bandpass_filter
+        low_n = max(low / nyquist, 0.01)
+        high_n = min(min(high, nyquist - 100) / nyquist, 0.99)
+        if low_n < high_n:
+            _sos_for(round(low_n, 6), round(high_n, 6), 4)
+    _mel_basis(44100, 2048)
+
+
+# Worker processes for /detect-instruments. Spawned rather than forked so a
+# worker never inherits locks held by the server's own threads.
+# The cores are split between requests and the bands within one: each worker
+# runs its bands on DETECTION_THREADS threads (a request is usually 1-3
+# bands), so a full pool stays at about one thread per core
+DETECTION_THREADS = min(3, os.cpu_count() or 1)
+PROCESS_POOL_WORKERS = max(1, (os.cpu_count() or 1) // DETECTION_THREADS)
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool(broken: Optional[ProcessPoolExecutor] = None) -> ProcessPoolExecutor:
+    """
+    The /detect-instruments worker pool, created on first use.
+
+    Pass the pool a call failed on with BrokenProcessPool to replace it: a
+    worker killed mid-task (OOM, a native crash) leaves the executor
+    rejecting every later submit.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool is broken:
+            if broken is not None:
+                broken.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warm_librosa,
+            )
+        return _process_pool
+
+
 @app.post('/detect-instruments')
 async def detect_instruments(
     file: UploadFile = File(...),
@@ -4426,47 +5382,12 @@ async def detect_instruments(
     - Compression: Bring up quiet elements, control dynamics
     - De-reverb/De-delay: Remove room ambience for cleaner detection
     """
-    import json
-    from scipy.signal import butter, sosfilt
-
     logger.info(f'=== Instrument Detection ===')
     logger.info(f'Types: {instrument_types}, Stereo: {detect_stereo}')
 
     # Parse requested instrument types
     requested_types = [t.strip().lower() for t in instrument_types.split(',')]
 
-    # Map simple names to filter bands
-    TYPE_MAPPING = {
-        'vocals': ['vocal_body', 'vocal_presence', 'vocal_air'],
-        'vocal': ['vocal_body', 'vocal_presence', 'vocal_air'],
-        'adlibs': ['adlib'],
-        'adlib': ['adlib'],
-        'background': ['adlib', 'harmony'],
-        'bgv': ['adlib', 'harmony'],
-        'harmony': ['harmony'],
-        'harmonies': ['harmony'],
-        'bass': ['bass', 'sub_bass', 'bass_harmonics'],
-        'piano': ['piano_low', 'piano_mid', 'piano_high'],
-        'keys': ['piano_low', 'piano_mid', 'piano_high'],
-        'guitar': ['guitar', 'guitar_bright'],
-        'synth': ['synth_lead', 'synth_pad', 'pluck'],
-        'lead': ['synth_lead', 'vocal_presence'],
-        'pad': ['synth_pad', 'strings'],
-        'strings': ['strings'],
-        'brass': ['brass'],
-        # Sound FX
-        'sound_fx': ['uplifter', 'downlifter', 'impact', 'sub_drop', 'reverse_crash',
-                     'white_noise', 'swoosh', 'tape_stop', 'stutter', 'vocal_chop'],
-        'fx': ['uplifter', 'downlifter', 'impact', 'sub_drop', 'reverse_crash',
-               'white_noise', 'swoosh', 'tape_stop', 'stutter', 'vocal_chop'],
-        'risers': ['uplifter', 'reverse_crash', 'white_noise'],
-        'drops': ['downlifter', 'impact', 'sub_drop'],
-        'transitions': ['uplifter', 'downlifter', 'swoosh', 'reverse_crash', 'white_noise'],
-        'impacts': ['impact', 'sub_drop'],
-        'glitch': ['stutter', 'tape_stop', 'vocal_chop'],
-        'all': list(INSTRUMENT_FILTERS.keys()),
-    }
-
     # Expand requested types to filter bands
     filter_bands = set()
     for req_type in requested_types:
@@ -4488,285 +5409,35 @@ async def detect_instruments(
         suffix = Path(file.filename).suffix if file.filename else '.wav'
         temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False, dir=str(TEMP_DIR))
         temp_path = temp_file.name
-        content = await file.read()
-        temp_file.write(content)
+        # Pool workers get a path, so the upload is never pickled through the pool
+        hasher = hashlib.sha1()
+        await copy_upload(file, temp_file, hasher)
         temp_file.close()
 
-        # Load audio - STEREO for panning detection
-        if detect_stereo:
-            y_stereo, sr = librosa.load(temp_path, sr=44100, mono=False)
-            if y_stereo.ndim == 1:
-                # Mono file, duplicate for stereo processing
-                y_left = y_stereo
-                y_right = y_stereo
-                y_mono = y_stereo
-            else:
-                y_left = y_stereo[0]
-                y_right = y_stereo[1]
-                y_mono = librosa.to_mono(y_stereo)
-        else:
-            y_mono, sr = librosa.load(temp_path, sr=44100, mono=True)
-            y_left = y_mono
-            y_right = y_mono
-
-        duration = len(y_mono) / sr
-        if end_time is None or end_time > duration:
-            end_time = duration
-
-        logger.info(f'Audio loaded: {duration:.2f}s, scanning {start_time:.2f}s to {end_time:.2f}s')
-
-        # Apply HPSS preprocessing
-        # Harmonic component for melodic instruments (vocals, piano, synth, strings, bass)
-        # Percussive component for drums and transients
-        logger.info('Applying HPSS preprocessing for cleaner instrument detection...')
-        D_mono = librosa.stft(y_mono)
-        H_mono, P_mono = librosa.decompose.hpss(D_mono, margin=2.0)
-        y_harmonic = librosa.istft(H_mono, length=len(y_mono))
-        y_percussive = librosa.istft(P_mono, length=len(y_mono))
-
-        # Normalize
-        if np.max(np.abs(y_harmonic)) > 0:
-            y_harmonic = y_harmonic / np.max(np.abs(y_harmonic))
-        if np.max(np.abs(y_percussive)) > 0:
-            y_percussive = y_percussive / np.max(np.abs(y_percussive))
-
-        logger.info(f'HPSS complete: harmonic RMS={np.sqrt(np.mean(y_harmonic**2)):.4f}, percussive RMS={np.sqrt(np.mean(y_percussive**2)):.4f}')
-
-        # Define which instruments use harmonic vs percussive
-        PERCUSSIVE_INSTRUMENTS = {'kick', 'snare', 'hihat', 'clap', 'tom', 'perc',
-                                   'impact', 'stutter', 'reverse_crash'}
-
-        # Bandpass filter function
-        def bandpass_filter(data, lowcut, highcut, fs, order=4):
-            nyq = 0.5 * fs
-            low = max(lowcut / nyq, 0.01)
-            high = min(highcut / nyq, 0.99)
-            if low >= high:
-                return data
-            try:
-                sos = butter(order, [low, high], btype='band', output='sos')
-                filtered = sosfilt(sos, data)
-                if not np.isfinite(filtered).all():
-                    return data
-                return filtered
-            except:
-                return data
-
-        # Create filtered audio for each band with advanced processing
-        filtered_mono = {}
-        filtered_left = {}
-        filtered_right = {}
-
-        logger.info(f'Advanced processing: EQ={use_dynamic_eq}, Comp={use_compression}, DeReverb={use_dereverb}')
-
-        for band_name in filter_bands:
-            if band_name not in INSTRUMENT_FILTERS:
-                continue
-            low, high = INSTRUMENT_FILTERS[band_name]
-
-            # Step 1: Select HPSS component based on instrument type
-            # Percussive: drums, impacts, transients
-            # Harmonic: vocals, bass, piano, synth, strings
-            if band_name in PERCUSSIVE_INSTRUMENTS:
-                y_source = y_percussive
-                logger.debug(f'{band_name}: using percussive component')
-            else:
-                y_source = y_harmonic
-                logger.debug(f'{band_name}: using harmonic component')
-
-            # Step 2: Bandpass filter on HPSS component
-            y_band = bandpass_filter(y_source, low, min(high, sr/2 - 100), sr)
-
-            # Step 2: De-reverb/De-delay (before other processing for cleaner signal)
-            if use_dereverb and band_name in DEREVERB_PRESETS:
-                preset = DEREVERB_PRESETS[band_name]
-                y_band = remove_reverb_delay(
-                    y_band, sr,
-                    reverb_reduction=preset['reverb_reduction'] * dereverb_strength,
-                    delay_reduction=preset['delay_reduction'] * dereverb_strength,
-                    transient_preserve=preset['transient_preserve']
-                )
-
-            # Step 3: Dynamic EQ (boost target, cut competing frequencies)
-            if use_dynamic_eq and band_name in DYNAMIC_EQ_PROFILES:
-                y_band = apply_dynamic_eq(y_band, sr, band_name, strength=eq_strength)
-
-            # Step 4: Compression (bring up quiet elements)
-            if use_compression and band_name in COMPRESSION_PRESETS:
-                preset = COMPRESSION_PRESETS[band_name]
-                y_band = apply_compressor(
-                    y_band, sr,
-                    threshold_db=preset['threshold_db'],
-                    ratio=preset['ratio'],
-                    attack_ms=preset['attack_ms'],
-                    release_ms=preset['release_ms'],
-                    makeup_db=preset['makeup_db']
-                )
-
-            filtered_mono[band_name] = y_band
-
-            # Process stereo channels too
-            if detect_stereo:
-                y_band_left = bandpass_filter(y_left, low, min(high, sr/2 - 100), sr)
-                y_band_right = bandpass_filter(y_right, low, min(high, sr/2 - 100), sr)
-
-                if use_dereverb and band_name in DEREVERB_PRESETS:
-                    preset = DEREVERB_PRESETS[band_name]
-                    y_band_left = remove_reverb_delay(
-                        y_band_left, sr,
-                        reverb_reduction=preset['reverb_reduction'] * dereverb_strength,
-                        delay_reduction=preset['delay_reduction'] * dereverb_strength,
-                        transient_preserve=preset['transient_preserve']
-                    )
-                    y_band_right = remove_reverb_delay(
-                        y_band_right, sr,
-                        reverb_reduction=preset['reverb_reduction'] * dereverb_strength,
-                        delay_reduction=preset['delay_reduction'] * dereverb_strength,
-                        transient_preserve=preset['transient_preserve']
-                    )
-
-                if use_dynamic_eq and band_name in DYNAMIC_EQ_PROFILES:
-                    y_band_left = apply_dynamic_eq(y_band_left, sr, band_name, strength=eq_strength)
-                    y_band_right = apply_dynamic_eq(y_band_right, sr, band_name, strength=eq_strength)
-
-                if use_compression and band_name in COMPRESSION_PRESETS:
-                    preset = COMPRESSION_PRESETS[band_name]
-                    y_band_left = apply_compressor(y_band_left, sr, **preset)
-                    y_band_right = apply_compressor(y_band_right, sr, **preset)
-
-                filtered_left[band_name] = y_band_left
-                filtered_right[band_name] = y_band_right
-
-        # Detect onsets in each band
-        results = {}
-        window_samples = int(sr * 0.05)  # 50ms window
-
-        def get_rms(audio, start_sample, end_sample):
-            segment = audio[max(0, start_sample):min(len(audio), end_sample)]
-            if len(segment) == 0:
-                return 0.0
-            return float(np.sqrt(np.mean(segment ** 2)))
-
-        def get_stereo_position(left_audio, right_audio, start_sample, end_sample):
-            """Calculate stereo position: -1 (left) to +1 (right), 0 = center"""
-            left_rms = get_rms(left_audio, start_sample, end_sample)
-            right_rms = get_rms(right_audio, start_sample, end_sample)
-            total = left_rms + right_rms
-            if total < 0.0001:
-                return 0.0
-            return (right_rms - left_rms) / total
-
-        for band_name in filter_bands:
-            if band_name not in filtered_mono:
-                continue
-
-            y_filtered = filtered_mono[band_name]
-            threshold = INSTRUMENT_THRESHOLDS.get(band_name, 0.005) * energy_multiplier
-
-            # Detect onsets using librosa
-            onset_env = librosa.onset.onset_strength(y=y_filtered, sr=sr)
-            onset_frames = librosa.onset.onset_detect(
-                onset_envelope=onset_env, sr=sr,
-                pre_max=3, post_max=3, pre_avg=5, post_avg=5,
-                delta=0.03 * energy_multiplier,
-                wait=int(sr * 0.05 / 512)  # Min 50ms between onsets
-            )
-            onset_times = librosa.frames_to_time(onset_frames, sr=sr)
-
-            # Filter to time range and collect details
-            band_results = []
-            for onset_time in onset_times:
-                if onset_time < start_time or onset_time > end_time:
-                    continue
-
-                center_sample = int(onset_time * sr)
-                start_sample = center_sample - window_samples // 2
-                end_sample = center_sample + window_samples // 2
-
-                energy = get_rms(y_filtered, start_sample, end_sample)
-
-                if energy < threshold:
-                    continue
-
-                hit = {
-                    'time': round(onset_time, 4),
-                    'energy': round(energy, 5),
-                    'band': band_name,
-                    'filter_range': f'{INSTRUMENT_FILTERS[band_name][0]}-{INSTRUMENT_FILTERS[band_name][1]}Hz',
-                }
-
-                # Add stereo position for ad-libs/background vocals
-                if detect_stereo and band_name in ['adlib', 'harmony', 'vocal_body', 'vocal_presence']:
-                    stereo_pos = get_stereo_position(
-                        filtered_left.get(band_name, y_left),
-                        filtered_right.get(band_name, y_right),
-                        start_sample, end_sample
-                    )
-                    hit['stereo_position'] = round(stereo_pos, 3)
-                    hit['pan'] = 'left' if stereo_pos < -0.2 else ('right' if stereo_pos > 0.2 else 'center')
-
-                    # Flag potential ad-libs (panned, lower energy than main vocal)
-                    if band_name in ['adlib', 'harmony'] and abs(stereo_pos) > 0.15:
-                        hit['likely_adlib'] = True
-
-                band_results.append(hit)
-
-            results[band_name] = band_results
-            logger.info(f'  {band_name}: {len(band_results)} detections')
-
-        # Combine vocal bands into unified vocal timeline
-        vocal_bands = ['vocal_body', 'vocal_presence', 'vocal_air', 'sibilance']
-        adlib_bands = ['adlib', 'harmony']
-
-        all_vocals = []
-        all_adlibs = []
-
-        for band in vocal_bands:
-            if band in results:
-                for hit in results[band]:
-                    hit['type'] = 'vocal'
-                    all_vocals.append(hit)
-
-        for band in adlib_bands:
-            if band in results:
-                for hit in results[band]:
-                    hit['type'] = 'adlib' if hit.get('likely_adlib') else 'background_vocal'
-                    all_adlibs.append(hit)
-
-        # Sort by time
-        all_vocals.sort(key=lambda x: x['time'])
-        all_adlibs.sort(key=lambda x: x['time'])
-
-        # Deduplicate nearby detections (within 50ms)
-        def deduplicate(hits, window=0.05):
-            if not hits:
-                return []
-            deduped = [hits[0]]
-            for hit in hits[1:]:
-                if hit['time'] - deduped[-1]['time'] > window:
-                    deduped.append(hit)
-                elif hit['energy'] > deduped[-1]['energy']:
-                    deduped[-1] = hit
-            return deduped
-
-        all_vocals = deduplicate(all_vocals)
-        all_adlibs = deduplicate(all_adlibs)
-
-        return {
-            'success': True,
-            'duration': duration,
-            'scan_range': {'start': start_time, 'end': end_time},
-            'filter_bands_used': list(filter_bands),
-            'results_by_band': results,
-            'vocals': all_vocals,
-            'adlibs': all_adlibs,
-            'total_vocal_hits': len(all_vocals),
-            'total_adlib_hits': len(all_adlibs),
-            'settings': {
-                'energy_multiplier': energy_multiplier,
-                'stereo_detection': detect_stereo,
-            }
+        # The DSP below is CPU-bound for seconds at a time; running it in a
+        # worker process keeps the event loop free for other requests
+        params = {
+            'filter_bands': filter_bands,
+            'digest': hasher.hexdigest(),
+            'start_time': start_time,
+            'end_time': end_time,
+            'energy_multiplier': energy_multiplier,
+            'detect_stereo': detect_stereo,
+            'use_dynamic_eq': use_dynamic_eq,
+            'eq_strength': eq_strength,
+            'use_compression': use_compression,
+            'use_dereverb': use_dereverb,
+            'dereverb_strength': dereverb_strength,
         }
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        try:
+            body = await loop.run_in_executor(pool, _run_detection_json, temp_path, params)
+        except BrokenProcessPool:
+            # A worker died; swap in a fresh pool so later requests still work
+            get_process_pool(broken=pool)
+            raise
+        return Response(content=body, media_type='application/json')
 
     except Exception as e:
         logger.error(f'Error in instrument detection: {e}')
@@ -5104,6 +5775,58 @@ async def validate_single_instrument(instrument: str):
 # Reverb/Delay Analysis
 # =============================================================================
 
+@njit(cache=True)
+def _schroeder_decay_indices(audio):
+    """
+    First sample indices where the Schroeder curve (energy from i to the end,
+    relative to the total) reaches -10 dB and -20 dB, or -1 if it never does.
+
+    Walks the signal once after the total instead of building the reversed
+    cumulative sum and its dB curve, and stops at the -20 dB crossing.
+    """
+    total = 0.0
+    for i in range(audio.shape[0]):
+        v = np.float64(audio[i])
+        total += v * v
+    idx_10db = -1
+    idx_20db = -1
+    if total <= 0.0:
+        return total, idx_10db, idx_20db
+
+    # 10*log10(tail/total + 1e-10) <= -X dB  <=>  tail <= total * (10^(-X/10) - 1e-10)
+    limit_10db = total * (0.1 - 1e-10)
+    limit_20db = total * (0.01 - 1e-10)
+    tail = total
+    for i in range(audio.shape[0]):
+        if idx_10db < 0 and tail <= limit_10db:
+            idx_10db = i
+        if tail <= limit_20db:
+            idx_20db = i
+            break
+        v = np.float64(audio[i])
+        tail -= v * v
+    return total, idx_10db, idx_20db
+
+
+def _schroeder_decay_indices_np(audio):
+    """
+    Vectorized _schroeder_decay_indices for when numba is unavailable (the
+    kernel would otherwise run as a per-sample Python loop).
+
+    The energy already consumed before sample i is non-decreasing, so each
+    crossing is a binary search instead of an np.where over the dB curve.
+    """
+    energy = np.cumsum(np.square(audio, dtype=np.float64))
+    total = float(energy[-1]) if len(energy) else 0.0
+    if total <= 0.0:
+        return total, -1, -1
+
+    consumed = np.concatenate(([0.0], energy[:-1]))
+    idx = np.searchsorted(consumed, [total - total * (0.1 - 1e-10), total - total * (0.01 - 1e-10)])
+    idx_10db, idx_20db = (int(i) if i < len(consumed) else -1 for i in idx)
+    return total, idx_10db, idx_20db
+
+
 @app.post('/analyze-reverb-delay')
 async def analyze_reverb_delay(
     file: UploadFile = File(...),
@@ -5134,12 +5857,12 @@ async def analyze_reverb_delay(
         suffix = Path(file.filename).suffix if file.filename else '.wav'
         temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False, dir=str(TEMP_DIR))
         temp_path = temp_file.name
-        content = await file.read()
-        temp_file.write(content)
+        hasher = hashlib.sha1()
+        await copy_upload(file, temp_file, hasher)
         temp_file.close()
 
         # Load stereo audio
-        y_stereo, sr = librosa.load(temp_path, sr=44100, mono=False)
+        y_stereo, sr = load_audio_cached(temp_path, hasher.hexdigest(), sr=44100, mono=False)
 
         if y_stereo.ndim == 1:
             # Mono file
@@ -5180,14 +5903,21 @@ async def analyze_reverb_delay(
             if len(left) == 0:
                 return {'correlation': 1.0, 'width': 0.0, 'l_r_balance': 0.0}
 
-            # Cross-correlation at zero lag
-            l_norm = left - np.mean(left)
-            r_norm = right - np.mean(right)
-            l_std = np.std(l_norm)
-            r_std = np.std(r_norm)
-
-            if l_std > 0 and r_std > 0:
-                correlation = np.mean(l_norm * r_norm) / (l_std * r_std)
+            # Cross-correlation at zero lag, from raw sums and dot products
+            # (cov = E[lr] - E[l]E[r]) so each channel is read a couple of
+            # times instead of once per mean/std/product. Audio is near
+            # zero-mean, so the moment form doesn't lose precision.
+            n = len(left)
+            l_mean = left.sum() / n
+            r_mean = right.sum() / n
+            l_energy = np.dot(left, left)
+            r_energy = np.dot(right, right)
+            l_var = l_energy / n - l_mean * l_mean
+            r_var = r_energy / n - r_mean * r_mean
+
+            if l_var > 0 and r_var > 0:
+                covariance = np.dot(left, right) / n - l_mean * r_mean
+                correlation = covariance / np.sqrt(l_var * r_var)
             else:
                 correlation = 1.0
 
@@ -5196,8 +5926,6 @@ async def analyze_reverb_delay(
             width = 1.0 - abs(correlation)
 
             # L/R balance (-1 = all left, +1 = all right)
-            l_energy = np.sum(left ** 2)
-            r_energy = np.sum(right ** 2)
             total = l_energy + r_energy
             if total > 0:
                 balance = (r_energy - l_energy) / total
@@ -5210,36 +5938,37 @@ async def analyze_reverb_delay(
                 'l_r_balance': float(balance),
             }
 
+        def is_silent(audio, floor=1e-3):
+            """True if the audio never exceeds -60 dBFS (checked on every 100th sample)."""
+            # Strided so the gate is nearly free; real program material is never
+            # quiet for 100 consecutive samples while peaking above the floor
+            return len(audio) == 0 or float(np.abs(audio[::100]).max()) < floor
+
         # === 2. RT60 ESTIMATION (Reverb Time) ===
         def estimate_rt60(audio, sr):
             """
             Estimate RT60 from energy decay curve.
             Uses Schroeder integration (backwards integration of squared signal).
             """
-            # Square the signal
-            energy = audio ** 2
-
-            # Schroeder integration (cumulative sum from end)
-            schroeder = np.cumsum(energy[::-1])[::-1]
+            if is_silent(audio):
+                return None
 
-            # Normalize
-            if schroeder[0] > 0:
-                schroeder_db = 10 * np.log10(schroeder / schroeder[0] + 1e-10)
-            else:
+            # Schroeder integration, normalized, and its -10/-20dB crossings
+            schroeder = _schroeder_decay_indices if NUMBA_AVAILABLE else _schroeder_decay_indices_np
+            total, decay_10db_idx, decay_20db_idx = schroeder(audio)
+            if total <= 0:
                 return None
 
             # Find time to decay by 60dB (or extrapolate from 20dB decay)
             # T20 extrapolation: find -20dB point, multiply time by 3
-            decay_20db_idx = np.where(schroeder_db <= -20)[0]
-            if len(decay_20db_idx) > 0:
-                t20 = decay_20db_idx[0] / sr
+            if decay_20db_idx >= 0:
+                t20 = decay_20db_idx / sr
                 rt60 = t20 * 3  # Extrapolate to 60dB
                 return float(np.clip(rt60, 0.1, 10.0))  # Clamp to reasonable range
 
             # If can't find -20dB, try -10dB and extrapolate
-            decay_10db_idx = np.where(schroeder_db <= -10)[0]
-            if len(decay_10db_idx) > 0:
-                t10 = decay_10db_idx[0] / sr
+            if decay_10db_idx >= 0:
+                t10 = decay_10db_idx / sr
                 rt60 = t10 * 6  # Extrapolate to 60dB
                 return float(np.clip(rt60, 0.1, 10.0))
 
@@ -5251,22 +5980,36 @@ async def analyze_reverb_delay(
             Detect discrete delay echoes using autocorrelation.
             Looks for peaks in the autocorrelation at musically relevant intervals.
             """
+            if is_silent(audio):
+                return None
+
             # Compute autocorrelation
             max_lag = int(max_delay_ms * sr / 1000)
 
             # Use short segment for speed
             segment = audio[:min(len(audio), sr * 4)]  # First 4 seconds
 
-            # Normalize
-            if np.std(segment) > 0:
-                segment_norm = (segment - np.mean(segment)) / np.std(segment)
-            else:
-                return None
-
-            # Autocorrelation using FFT
-            n = len(segment_norm)
-            fft = np.fft.fft(segment_norm, n=2*n)
-            autocorr = np.fft.ifft(fft * np.conj(fft))[:n].real
+            # Remove DC in the same pass as the float64 conversion. Scaling by
+            # the std is unnecessary - it cancels in autocorr / autocorr[0] -
+            # but the mean is not: an offset adds a ramp to every lag.
+            segment_centered = np.subtract(segment, segment.mean(dtype=np.float64), dtype=np.float64)
+
+            # Autocorrelation using FFT. The input is real, so a real FFT does
+            # half the work, and |X|^2 skips the complex multiply. Only lags below
+            # max_lag are searched, so padding to a fast length >= n + max_lag
+            # (instead of the full 2n-1) keeps those lags free of circular
+            # wrap-around. scipy.signal.correlate(method='fft') always computes
+            # the full 2n-1 result and measured ~4x slower on a 4 s segment.
+            # Every section has the same length, so with pyfftw the plan is
+            # built once and the 200000-point transforms run ~3x faster.
+            fft = pyfftw.interfaces.scipy_fft if PYFFTW_AVAILABLE else scipy.fft
+            n = len(segment_centered)
+            n_lags = min(n, max_lag)
+            n_fft = scipy.fft.next_fast_len(n + n_lags, real=True)
+            spec = fft.rfft(segment_centered, n=n_fft)
+            autocorr = fft.irfft(spec.real ** 2 + spec.imag ** 2, n=n_fft)[:n_lags]
+            if autocorr[0] <= 0:
+                return None  # Constant segment
             autocorr = autocorr / autocorr[0]  # Normalize
 
             # Find peaks (excluding the main peak at lag 0)
@@ -5308,8 +6051,12 @@ async def analyze_reverb_delay(
             Estimate pre-delay by analyzing onset characteristics.
             Looks at the gap between transient and sustained sound.
             """
-            # Get onset envelope
-            onset_env = librosa.onset.onset_strength(y=audio, sr=sr)
+            if is_silent(audio):
+                return None
+
+            # Get onset envelope (only called for the full track, so there is no
+            # per-section envelope to share; reuse the cached mel filterbank instead)
+            onset_env = librosa.onset.onset_strength(y=audio, sr=sr, feature=melspectrogram_cached)
 
             # Find first significant onset
             threshold = np.max(onset_env) * 0.3
@@ -5346,6 +6093,8 @@ async def analyze_reverb_delay(
             return 10.0  # Default estimate
 
         # === 5. ANALYZE FULL TRACK ===
+        # RT60 and delay run at the full 44.1kHz rate; decimating first costs
+        # about as much as the work it would save.
         global_stereo = analyze_stereo_width(y_left, y_right)
         global_rt60 = estimate_rt60(y_mono, sr)
         global_delay = detect_delay_echoes(y_mono, sr)
@@ -5365,7 +6114,7 @@ async def analyze_reverb_delay(
             section_samples = int(section_length * sr)
             num_sections = int(len(y_mono) / section_samples)
 
-            for i in range(min(num_sections, 8)):  # Max 8 sections
+            def analyze_section(i):
                 start = i * section_samples
                 end = start + section_samples
 
@@ -5377,13 +6126,18 @@ async def analyze_reverb_delay(
                 section_rt60 = estimate_rt60(section_mono, sr)
                 section_delay = detect_delay_echoes(section_mono, sr)
 
-                results['sections'].append({
+                return {
                     'start_time': float(start_time + i * section_length),
                     'end_time': float(start_time + (i + 1) * section_length),
                     'stereo': section_stereo,
                     'rt60_seconds': section_rt60,
                     'delay': section_delay,
-                })
+                }
+
+            # Sections are disjoint slices and the FFT/cumsum/BLAS work inside
+            # releases the GIL, so threads parallelize them without copying audio
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                results['sections'] = list(executor.map(analyze_section, range(min(num_sections, 8))))  # Max 8 sections
 
         # === 7. GENERATE RECOMMENDATIONS ===
         results['recommendations'] = generate_reverb_recommendations(results['global'])
@@ -5401,8 +6155,9 @@ async def analyze_reverb_delay(
                 os.remove(temp_path)
             except Exception:
                 pass
-        # Explicit garbage collection after processing large audio
-        gc.collect()
+        # No gc.collect() here: the audio arrays are freed by refcounting when
+        # the handler returns, and a full collection walks the ~200k objects
+        # librosa/scipy/sklearn leave on the heap (~55ms) on the event loop
 
 
 def describe_rt60(rt60: float) -> str:
@@ -5537,15 +6292,21 @@ async def analyze_frequency_bands(
     """
     logger.info('=== Frequency Band Analysis ===')
 
-    temp_path = f'/tmp/freq_analyze_{file.filename}'
+    # Use proper temp file handling for automatic cleanup
+    temp_file = None
+    temp_path = None
     try:
-        # Save file
-        with open(temp_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
+        # Create temp file with proper suffix
+        suffix = Path(file.filename).suffix if file.filename else '.wav'
+        temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False, dir=str(TEMP_DIR))
+        temp_path = temp_file.name
+        hasher = hashlib.sha1()
+        await copy_upload(file, temp_file, hasher)
+        temp_file.close()
 
         # Load audio
-        y, sr = librosa.load(temp_path, sr=44100, mono=True)
+        digest = hasher.hexdigest()
+        y, sr = load_audio_cached(temp_path, digest, sr=44100, mono=True)
         duration = len(y) / sr
 
         if end_time is None or end_time > duration:
@@ -5560,16 +6321,14 @@ async def analyze_frequency_bands(
 
         # Apply HPSS if requested
         if use_hpss:
-            D = librosa.stft(y)
-            H, P = librosa.decompose.hpss(D, margin=2.0)
-            y_harmonic = librosa.istft(H, length=len(y))
-            y_percussive = librosa.istft(P, length=len(y))
+            y_harmonic, y_percussive = hpss_components_cached(
+                f'{digest}:mono:{start_sample}:{end_sample}', y, margin=2.0)
         else:
             y_harmonic = y
             y_percussive = y
 
         # Bandpass filter function
-        from scipy.signal import butter, sosfilt
+        from scipy.signal import sosfilt
 
         def bandpass_filter(data, lowcut, highcut, fs, order=4):
             nyq = 0.5 * fs
@@ -5578,16 +6337,24 @@ async def analyze_frequency_bands(
             if low >= high:
                 return data
             try:
-                sos = butter(order, [low, high], btype='band', output='sos')
+                # Shared design cache with /detect-instruments (same bands, same
+                # quantization); the rounded cutoffs move band levels by ~1e-4
+                sos = _sos_for(round(low, 6), round(high, 6), order)
                 return sosfilt(sos, data)
             except:
                 return data
 
+        # Both reductions read the band once without an audio ** 2 / abs
+        # temporary. The filter outputs are float64 (sosfilt keeps the
+        # recursion in double precision); a float32 cast costs more than the
+        # halved reads save, and a dot product in float32 drifts in the
+        # sixth digit over a full track.
         def get_rms(audio):
-            return float(np.sqrt(np.mean(audio ** 2)))
+            audio = np.asarray(audio, dtype=np.float64)
+            return float(np.sqrt(np.dot(audio, audio) / len(audio)))
 
         def get_peak(audio):
-            return float(np.max(np.abs(audio)))
+            return float(max(audio.max(), -audio.min()))
 
         # Categorize instruments
         CATEGORIES = {
@@ -5615,6 +6382,9 @@ async def analyze_frequency_bands(
         }
 
         # Analyze each frequency band
+        # Per-band IIR filters on purpose: the peak needs the filtered waveform.
+        # Bands sharing a source and cutoffs are measured once.
+        band_levels = {}
         all_bands = []
         for category, instruments in CATEGORIES.items():
             source = y_percussive if category in USE_PERCUSSIVE else y_harmonic
@@ -5625,10 +6395,11 @@ async def analyze_frequency_bands(
                     continue
 
                 low, high = INSTRUMENT_FILTERS[inst]
-                filtered = bandpass_filter(source, low, high, sr)
-
-                rms = get_rms(filtered)
-                peak = get_peak(filtered)
+                level_key = (category in USE_PERCUSSIVE, low, high)
+                if level_key not in band_levels:
+                    filtered = bandpass_filter(source, low, high, sr)
+                    band_levels[level_key] = (get_rms(filtered), get_peak(filtered))
+                rms, peak = band_levels[level_key]
                 threshold = INSTRUMENT_THRESHOLDS.get(inst, 0.005)
 
                 # Calculate signal-to-threshold ratio
@@ -5714,8 +6485,12 @@ async def analyze_frequency_bands(
         logger.error(f'Error in frequency analysis: {e}', exc_info=True)
         return {'success': False, 'error': str(e)}
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Clean up temp file
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except Exception:
+                pass
 
 
 # =============================================================================
@@ -5747,7 +6522,7 @@ async def detect_adaptive(
     logger.info(f'BPM: {bpm}, Target bars: {target_bars}, Sensitivity boost: {sensitivity_boost}x')
 
     import json
-    from scipy.signal import butter, sosfilt
+    from scipy.signal import sosfilt
 
     temp_file = None
     temp_path = None
@@ -5757,12 +6532,12 @@ async def detect_adaptive(
         suffix = Path(file.filename).suffix if file.filename else '.wav'
         temp_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False, dir=str(TEMP_DIR))
         temp_path = temp_file.name
-        content = await file.read()
-        temp_file.write(content)
+        hasher = hashlib.sha1()
+        await copy_upload(file, temp_file, hasher)
         temp_file.close()
 
-        # Load audio
-        y, sr = librosa.load(temp_path, sr=44100, mono=True)
+        # Load audio (a repeat upload is a read-only mmap of the cached decode)
+        y, sr = load_audio_cached(temp_path, hasher.hexdigest(), sr=44100, mono=True)
         duration = len(y) / sr
 
         # Parse existing hits
@@ -5771,7 +6546,8 @@ async def detect_adaptive(
         except:
             existing = []
 
-        existing_times = set(round(h.get('time', 0), 3) for h in existing)
+        # Kept sorted so the duplicate check only looks at the nearest neighbours
+        existing_times = sorted(set(round(h.get('time', 0), 3) for h in existing))
 
         # Calculate timing
         beat_duration = 60.0 / bpm
@@ -5784,17 +6560,17 @@ async def detect_adaptive(
         y_perc = apply_hpss_preprocessing(y, sr)
 
         # === STEP 1: Analyze energy per bar ===
-        bar_energies = []
-        for bar_idx in range(total_bars):
-            bar_start = downbeat_offset + (bar_idx * bar_duration)
-            bar_end = bar_start + bar_duration
-
-            start_sample = max(0, int(bar_start * sr))
-            end_sample = min(len(y_perc), int(bar_end * sr))
+        # Every bar's sum of squares comes from one running sum over the track
+        # instead of a slice, square and mean per bar
+        bar_starts = downbeat_offset + np.arange(total_bars) * bar_duration
+        start_samples = np.maximum(0, (bar_starts * sr).astype(np.int64))
+        end_samples = np.minimum(len(y_perc), ((bar_starts + bar_duration) * sr).astype(np.int64))
+        energy_csum = np.concatenate(([0.0], np.cumsum(np.square(y_perc, dtype=np.float64))))
 
+        bar_energies = []
+        for bar_idx, (start_sample, end_sample) in enumerate(zip(start_samples.tolist(), end_samples.tolist())):
             if end_sample > start_sample:
-                bar_audio = y_perc[start_sample:end_sample]
-                rms = float(np.sqrt(np.mean(bar_audio ** 2)))
+                rms = float(np.sqrt((energy_csum[end_sample] - energy_csum[start_sample]) / (end_sample - start_sample)))
                 bar_energies.append({'bar': bar_idx + 1, 'rms': rms})
             else:
                 bar_energies.append({'bar': bar_idx + 1, 'rms': 0})
@@ -5835,7 +6611,8 @@ async def detect_adaptive(
             if low >= high:
                 return data
             try:
-                sos = butter(order, [low, high], btype='band', output='sos')
+                # Shared design cache with /detect-instruments (same quantization)
+                sos = _sos_for(round(low, 6), round(high, 6), order)
                 filtered = sosfilt(sos, data)
                 return filtered if np.isfinite(filtered).all() else data
             except:
@@ -5850,22 +6627,24 @@ async def detect_adaptive(
             'perc': (2000, 8000),
         }
 
-        filtered_audio = {}
-        for drum_type, (low, high) in DRUM_FILTERS.items():
-            filtered_audio[drum_type] = bandpass_filter(y_perc, low, min(high, sr/2 - 100), sr)
+        def band_energy_csum(drum_type):
+            """Running sum of squares of one filtered band (csum[i] = sum of x[:i]**2)"""
+            low, high = DRUM_FILTERS[drum_type]
+            filtered = bandpass_filter(y_perc, low, min(high, sr/2 - 100), sr)
+            return np.concatenate(([0.0], np.cumsum(np.square(filtered, dtype=np.float64))))
 
         # === STEP 4: Adaptive detection per bar ===
         grid_duration = beat_duration / 4  # 16th note
         window_samples = int(sr * 0.05)  # 50ms window
 
-        def get_window_energy(audio, time_sec, sr, window_samples):
+        def get_window_energy(csum, time_sec, sr, window_samples):
+            """Window RMS from a running sum of squares (csum[i] = sum of x[:i]**2)"""
             center_sample = int(time_sec * sr)
             start = max(0, center_sample - window_samples // 2)
-            end = min(len(audio), center_sample + window_samples // 2)
+            end = min(len(csum) - 1, center_sample + window_samples // 2)
             if end <= start:
                 return 0.0
-            window = audio[start:end]
-            return float(np.sqrt(np.mean(window ** 2)))
+            return float(np.sqrt((csum[end] - csum[start]) / (end - start)))
 
         # Base thresholds (will be lowered for quiet sections)
         BASE_THRESHOLDS = {
@@ -5887,14 +6666,27 @@ async def detect_adaptive(
             'perc': [0, 2, 4, 6, 8, 10, 12, 14],   # 8th notes
         }
 
+        # Band energies stay time-domain filter RMS: BASE_THRESHOLDS are tuned against it.
+        # One running sum of squares per scanned band, so every grid check is
+        # two lookups instead of slicing and squaring a 50ms window. Each band
+        # is reduced as soon as it is filtered, so the float64 filter outputs
+        # never pile up (the SOS recursion itself stays float64 - float32
+        # coefficients drift), and bands with no grid positions (tom) aren't
+        # filtered at all. sosfilt's C loop releases the GIL, so the bands
+        # run in parallel threads.
+        scanned_types = [drum_type for drum_type, positions in EXPECTED_POSITIONS.items() if positions]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            energy_csums = dict(zip(scanned_types, executor.map(band_energy_csum, scanned_types)))
+
         new_hits = []
 
+        # Plain Python on purpose: every check here is O(1) or a bisect
         for bar_num in bars_to_scan:
             bar_idx = bar_num - 1
             bar_start = downbeat_offset + (bar_idx * bar_duration)
 
-            # Get bar energy info
-            bar_info = next((b for b in bar_energies if b['bar'] == bar_num), None)
+            # Get bar energy info (bar_energies[i] is bar i + 1)
+            bar_info = bar_energies[bar_idx] if 0 <= bar_idx < len(bar_energies) else None
             is_quiet = bar_info['is_quiet'] if bar_info else False
 
             # Apply sensitivity boost for quiet bars
@@ -5904,7 +6696,7 @@ async def detect_adaptive(
                 if not positions:
                     continue
 
-                filtered_y = filtered_audio[drum_type]
+                energy_csum = energy_csums[drum_type]
                 threshold = BASE_THRESHOLDS[drum_type] * threshold_multiplier
 
                 for grid_pos in positions:
@@ -5913,11 +6705,14 @@ async def detect_adaptive(
                     if hit_time < 0 or hit_time >= duration:
                         continue
 
-                    # Check if already have a hit here
-                    if any(abs(t - hit_time) < 0.03 for t in existing_times):
+                    # Check if already have a hit here (per candidate, so hits
+                    # added earlier in this bar count too)
+                    idx = bisect.bisect_left(existing_times, hit_time)
+                    if ((idx > 0 and hit_time - existing_times[idx - 1] < 0.03) or
+                            (idx < len(existing_times) and existing_times[idx] - hit_time < 0.03)):
                         continue
 
-                    energy = get_window_energy(filtered_y, hit_time, sr, window_samples)
+                    energy = get_window_energy(energy_csum, hit_time, sr, window_samples)
 
                     if energy > threshold:
                         new_hits.append({
@@ -5931,7 +6726,7 @@ async def detect_adaptive(
                             'is_quiet_bar': bool(is_quiet),
                             'source': 'adaptive_detection',
                         })
-                        existing_times.add(round(hit_time, 3))
+                        bisect.insort(existing_times, round(hit_time, 3))
 
         # Sort by time
         new_hits.sort(key=lambda x: x['time'])
@@ -5970,7 +6765,8 @@ async def detect_adaptive(
                 os.remove(temp_path)
             except:
                 pass
-        gc.collect()
+        # No gc.collect() here either (see analyze_reverb_delay): the arrays
+        # are freed by refcounting on return
 
 
 # =============================================================================
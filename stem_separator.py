@@ -13,20 +13,26 @@ Usage:
 import os
 import io
 import base64
+import json
 import tempfile
 import shutil
 import subprocess
 from pathlib import Path
+from contextlib import asynccontextmanager
 from typing import Optional
 import uuid
 import numpy as np
 import time
+import asyncio
 import threading
 import gc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Try to import audio processing libraries
@@ -39,15 +45,48 @@ except ImportError:
     print("Warning: soundfile or noisereduce not installed. Artifact reduction disabled.")
     print("Install with: pip install soundfile noisereduce")
 
+# torch is installed alongside demucs; use it for the spectral gate when a GPU is present
+try:
+    import torch
+    TORCH_CUDA_AVAILABLE = torch.cuda.is_available()
+except ImportError:
+    TORCH_CUDA_AVAILABLE = False
+
 # Configuration
 PORT = 56402
 STEMS_DIR = Path(tempfile.gettempdir()) / 'music-analyzer-stems'
 STEMS_DIR.mkdir(exist_ok=True)
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024  # 200MB
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+BASE64_CHUNK_SIZE = 3 << 16  # 192KB, a multiple of 3
+
+# Job cleanup task - runs every 30 minutes on the event loop
+JOB_CLEANUP_INTERVAL = 1800  # seconds
+
+
+async def _job_cleanup_loop():
+    while True:
+        await asyncio.sleep(JOB_CLEANUP_INTERVAL)
+        cleanup_old_jobs()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the old-job cleanup task while the app is up; stop the denoise workers on exit."""
+    cleanup_task = asyncio.create_task(_job_cleanup_loop())
+    print('Job cleanup task started (runs every 30 minutes)')
+    try:
+        yield
+    finally:
+        cleanup_task.cancel()
+        shutdown_denoise_pool()
+
 
 app = FastAPI(
     title='Stem Separator',
     description='Audio stem separation using Demucs with MIDI generation',
-    version='1.0.0'
+    version='1.0.0',
+    lifespan=lifespan,
 )
 
 # CORS for React frontend
@@ -91,30 +130,6 @@ def cleanup_old_jobs():
         print(f'Cleaned up {len(expired)} expired jobs')
 
 
-# Job cleanup timer - runs every 30 minutes
-_job_cleanup_timer_started = False
-
-
-def start_job_cleanup_timer():
-    """Start a background timer that cleans up old jobs every 30 minutes."""
-    global _job_cleanup_timer_started
-    if _job_cleanup_timer_started:
-        return
-
-    def cleanup_loop():
-        cleanup_old_jobs()
-        # Reschedule
-        timer = threading.Timer(1800, cleanup_loop)  # 1800 seconds = 30 minutes
-        timer.daemon = True
-        timer.start()
-
-    # Start initial timer
-    timer = threading.Timer(1800, cleanup_loop)
-    timer.daemon = True
-    timer.start()
-    _job_cleanup_timer_started = True
-
-
 class StemInfo(BaseModel):
     name: str
     filename: str
@@ -138,8 +153,8 @@ class JobStatus(BaseModel):
     result: Optional[SeparationResult] = None
 
 
-def run_demucs(input_path: str, output_dir: str, model: str = 'htdemucs') -> list[str]:
-    """Run Demucs stem separation."""
+def run_demucs(input_path: str, output_dir: str, model: str = 'htdemucs', mp3: bool = True) -> list[str]:
+    """Run Demucs stem separation (mp3=False leaves WAV stems for further processing)."""
     # Get the venv python path
     venv_python = Path(__file__).parent / 'venv' / 'bin' / 'python3.13'
 
@@ -147,9 +162,10 @@ def run_demucs(input_path: str, output_dir: str, model: str = 'htdemucs') -> lis
         str(venv_python), '-m', 'demucs',
         '--out', output_dir,
         '-n', model,
-        '--mp3',  # Output as MP3 for smaller file sizes
-        input_path
     ]
+    if mp3:
+        cmd.append('--mp3')  # Output as MP3 for smaller file sizes
+    cmd.append(input_path)
 
     result = subprocess.run(
         cmd,
@@ -225,30 +241,34 @@ def reduce_artifacts(audio_path: str, output_path: str, reduction_level: int = 5
             freq_mask_smooth_hz = 300
             time_mask_smooth_ms = 50
 
-        # Process each channel
-        processed_channels = []
-        for ch in range(audio.shape[1]):
-            channel_audio = audio[:, ch]
-
-            # Apply spectral gating / noise reduction
-            reduced = nr.reduce_noise(
-                y=channel_audio,
-                sr=sample_rate,
-                prop_decrease=prop_decrease,
-                n_fft=n_fft,
-                freq_mask_smooth_hz=freq_mask_smooth_hz,
-                time_mask_smooth_ms=time_mask_smooth_ms,
-                stationary=False,  # Non-stationary for music
-                n_std_thresh_stationary=1.5,
-                use_torch=False,  # Use scipy for compatibility
-            )
-            processed_channels.append(reduced)
+        # noisereduce stays the gate: its time is in FFTs, not the mask math
+        # a custom kernel could fuse
+
+        # Apply spectral gating / noise reduction to all channels in one call
+        # (noisereduce takes (channels, samples) and chunks them together)
+        gate_settings = dict(
+            y=audio.T,
+            sr=sample_rate,
+            prop_decrease=prop_decrease,
+            n_fft=n_fft,
+            freq_mask_smooth_hz=freq_mask_smooth_hz,
+            time_mask_smooth_ms=time_mask_smooth_ms,
+            stationary=False,  # Non-stationary for music
+            n_std_thresh_stationary=1.5,
+        )
+        reduced = None
+        if TORCH_CUDA_AVAILABLE:
+            # The gate is dominated by STFT/ISTFT FFTs, which the torch
+            # implementation runs on the GPU
+            try:
+                reduced = nr.reduce_noise(**gate_settings, use_torch=True, device='cuda')
+            except Exception as e:
+                print(f"GPU artifact reduction failed for {audio_path}, using CPU: {e}")
+        if reduced is None:
+            reduced = nr.reduce_noise(**gate_settings, use_torch=False)  # scipy
 
-        # Combine channels
-        if is_mono:
-            processed_audio = processed_channels[0]
-        else:
-            processed_audio = np.column_stack(processed_channels)
+        # Back to soundfile's (samples, channels) layout
+        processed_audio = reduced[0] if is_mono else reduced.T
 
         # Normalize to prevent clipping
         max_val = np.max(np.abs(processed_audio))
@@ -266,6 +286,73 @@ def reduce_artifacts(audio_path: str, output_path: str, reduction_level: int = 5
         return False
 
 
+def denoise_stem(stem_path: str, dest_path: str, reduction_level: int, stem_type: str):
+    """Reduce artifacts in one WAV stem and encode the result to dest_path as MP3."""
+    processed_wav = Path(dest_path).with_name(f'{stem_type}_processed.wav')
+
+    try:
+        # Apply artifact reduction to Demucs' WAV output
+        reduce_artifacts(
+            stem_path,
+            str(processed_wav),
+            reduction_level=reduction_level,
+            stem_type=stem_type
+        )
+
+        # Convert to MP3
+        result = subprocess.run([
+            'ffmpeg', '-y', '-i', str(processed_wav),
+            '-codec:a', 'libmp3lame', '-qscale:a', '2',
+            dest_path
+        ], capture_output=True, text=True, timeout=60)
+
+        if result.returncode != 0 or not Path(dest_path).exists():
+            raise RuntimeError(f'MP3 encoding failed for {stem_type}: {result.stderr}')
+    finally:
+        processed_wav.unlink(missing_ok=True)
+
+    # Demucs' WAV is only dropped once its MP3 exists
+    Path(stem_path).unlink(missing_ok=True)
+
+
+# Stems are independent and denoising is CPU-bound, so they run in worker
+# processes (spawned, so CUDA state and the job-tracking threads are never forked).
+# Every worker re-imports torch, so with a GPU a single worker keeps it to one
+# CUDA context; the stems then share the GPU one after another
+DENOISE_WORKERS = 1 if TORCH_CUDA_AVAILABLE else min(4, os.cpu_count() or 1)
+_denoise_pool = None
+_denoise_pool_lock = threading.Lock()
+
+
+def get_denoise_pool(broken: Optional[ProcessPoolExecutor] = None) -> ProcessPoolExecutor:
+    """
+    The artifact-reduction worker pool, created on first use.
+
+    Pass the pool a call failed on with BrokenProcessPool to replace it: a
+    worker killed mid-task (e.g. OOM on a long stem) leaves the executor
+    rejecting every later submit.
+    """
+    global _denoise_pool
+    with _denoise_pool_lock:
+        if _denoise_pool is None or _denoise_pool is broken:
+            if broken is not None:
+                broken.shutdown(wait=False)
+            _denoise_pool = ProcessPoolExecutor(
+                max_workers=DENOISE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _denoise_pool
+
+
+def shutdown_denoise_pool():
+    """Stop the artifact-reduction workers, if any were started."""
+    global _denoise_pool
+    with _denoise_pool_lock:
+        if _denoise_pool is not None:
+            _denoise_pool.shutdown(wait=False, cancel_futures=True)
+            _denoise_pool = None
+
+
 def process_separation(job_id: str, input_path: str, model: str, original_filename: str, artifact_reduction: int = 0):
     """Background task to process stem separation."""
     try:
@@ -276,57 +363,46 @@ def process_separation(job_id: str, input_path: str, model: str, original_filena
         job_dir = STEMS_DIR / job_id
         job_dir.mkdir(exist_ok=True)
 
-        # Run Demucs
-        stem_files = run_demucs(input_path, str(job_dir), model)
+        # Run Demucs. Stems that get artifact reduction come out as WAV so they
+        # can be read directly; they are encoded to MP3 once, after processing
+        reduce_stems = artifact_reduction > 0 and ARTIFACT_REDUCTION_AVAILABLE
+        stem_files = run_demucs(input_path, str(job_dir), model, mp3=not reduce_stems)
+        total_stems = len(stem_files)
+
+        # Apply artifact reduction if requested, all stems at once
+        if reduce_stems:
+            separation_jobs[job_id]['progress'] = f'Reducing artifacts (0/{total_stems})...'
+            pool = get_denoise_pool()
+            try:
+                futures = [
+                    pool.submit(
+                        denoise_stem,
+                        stem_path,
+                        str(job_dir / f'{Path(stem_path).stem}.mp3'),
+                        artifact_reduction,
+                        Path(stem_path).stem
+                    )
+                    for stem_path in stem_files
+                ]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    future.result()
+                    separation_jobs[job_id]['progress'] = f'Reducing artifacts ({done}/{total_stems})...'
+            except BrokenProcessPool:
+                # A worker died; swap in a fresh pool so later jobs still work
+                get_denoise_pool(broken=pool)
+                raise
 
         # Build stem info
         stems = []
-        total_stems = len(stem_files)
-
-        for idx, stem_path in enumerate(stem_files):
-            stem_file = Path(stem_path)
-            stem_name = stem_file.stem  # drums, bass, vocals, other
+        for stem_path in stem_files:
+            stem_name = Path(stem_path).stem  # drums, bass, vocals, other
 
             # Determine output path
             dest_path = job_dir / f'{stem_name}.mp3'
 
-            # Apply artifact reduction if requested
-            if artifact_reduction > 0 and ARTIFACT_REDUCTION_AVAILABLE:
-                separation_jobs[job_id]['progress'] = f'Reducing artifacts: {stem_name} ({idx + 1}/{total_stems})...'
-
-                # Need to convert MP3 to WAV for processing, then back
-                temp_wav = job_dir / f'{stem_name}_temp.wav'
-                processed_wav = job_dir / f'{stem_name}_processed.wav'
-
-                # Convert MP3 to WAV using ffmpeg
-                subprocess.run([
-                    'ffmpeg', '-y', '-i', stem_path,
-                    '-acodec', 'pcm_s16le', '-ar', '44100',
-                    str(temp_wav)
-                ], capture_output=True, timeout=60)
-
-                # Apply artifact reduction
-                reduce_artifacts(
-                    str(temp_wav),
-                    str(processed_wav),
-                    reduction_level=artifact_reduction,
-                    stem_type=stem_name
-                )
-
-                # Convert back to MP3
-                subprocess.run([
-                    'ffmpeg', '-y', '-i', str(processed_wav),
-                    '-codec:a', 'libmp3lame', '-qscale:a', '2',
-                    str(dest_path)
-                ], capture_output=True, timeout=60)
-
-                # Clean up temp files
-                temp_wav.unlink(missing_ok=True)
-                processed_wav.unlink(missing_ok=True)
-            else:
-                # No artifact reduction - just copy
-                if stem_path != str(dest_path):
-                    shutil.copy(stem_path, dest_path)
+            # No artifact reduction - just copy
+            if not reduce_stems and stem_path != str(dest_path):
+                shutil.copy(stem_path, dest_path)
 
             stems.append(StemInfo(
                 name=stem_name,
@@ -397,18 +473,21 @@ async def separate_stems(
     # Generate job ID
     job_id = str(uuid.uuid4())[:8]
 
-    # Save uploaded file
-    contents = await audio.read()
-
-    # Check file size (max 200MB for separation)
-    if len(contents) > 200 * 1024 * 1024:
-        raise HTTPException(400, 'File too large. Maximum size is 200MB')
-
-    # Save to temp file
+    # Stream the upload to a temp file, enforcing the size limit (max 200MB
+    # for separation) as it arrives rather than buffering it all first
     suffix = Path(audio.filename).suffix or '.wav'
     with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        tmp.write(contents)
         input_path = tmp.name
+        total = 0
+        while chunk := await audio.read(UPLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                break
+            tmp.write(chunk)
+
+    if total > MAX_UPLOAD_BYTES:
+        os.unlink(input_path)
+        raise HTTPException(413, 'File too large. Maximum size is 200MB')
 
     # Initialize job status with created_at for expiry tracking
     separation_jobs[job_id] = {
@@ -472,14 +551,17 @@ async def get_stem_base64(job_id: str, filename: str):
     if not stem_path.exists():
         raise HTTPException(404, 'Stem file not found')
 
-    with open(stem_path, 'rb') as f:
-        data = f.read()
+    # Stream the same JSON body chunk by chunk instead of holding the file and
+    # its encoding in memory; chunks are a multiple of 3 bytes so the pieces
+    # concatenate into one valid base64 string
+    def encode_chunks():
+        yield b'{"filename": ' + json.dumps(filename).encode() + b', "data": "'
+        with open(stem_path, 'rb') as f:
+            while chunk := f.read(BASE64_CHUNK_SIZE):
+                yield base64.b64encode(chunk)
+        yield b'", "mime_type": "audio/mpeg"}'
 
-    return {
-        'filename': filename,
-        'data': base64.b64encode(data).decode('utf-8'),
-        'mime_type': 'audio/mpeg'
-    }
+    return StreamingResponse(encode_chunks(), media_type='application/json')
 
 
 @app.delete('/jobs/{job_id}')
@@ -528,10 +610,6 @@ async def list_models():
 if __name__ == '__main__':
     import uvicorn
 
-    # Start job cleanup timer for memory management
-    start_job_cleanup_timer()
-    print('Job cleanup timer started (runs every 30 minutes)')
-
     print(f'Starting Stem Separator on port {PORT}')
     print(f'Stems directory: {STEMS_DIR}')
     uvicorn.run(app, host='0.0.0.0', port=PORT)